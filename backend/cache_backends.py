@@ -0,0 +1,375 @@
+import fnmatch
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+# Cache entries are plain dicts of the form {"timestamp": float, "data": Any};
+# freshness checks stay with the caller, backends only store and share them.
+
+HITS_FLUSH_INTERVAL = 30.0
+PRUNE_INTERVAL = 300.0
+
+
+def entry_size(data: Any) -> int:
+    """Approximate in-memory size of cached data in bytes."""
+    if hasattr(data, "memory_usage"):
+        return int(data.memory_usage(deep=True).sum())
+    if hasattr(data, "nbytes"):
+        return int(data.nbytes)
+    return len(pickle.dumps(data, protocol=5))
+
+
+class CacheBackend:
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the entry and counts a hit."""
+        raise NotImplementedError
+
+    def set(self, key: str, entry: dict):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def keys(self, prefix: str = "") -> List[str]:
+        raise NotImplementedError
+
+    def entries(self, prefix: str = "") -> List[dict]:
+        """Metadata for admin listings: key, age_seconds, size_bytes, hits."""
+        raise NotImplementedError
+
+    def invalidate(self, prefix: str = "", match: Optional[Callable[[str], bool]] = None) -> int:
+        removed = 0
+        for key in self.keys(prefix):
+            if match is None or match(key):
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def clear(self):
+        for key in self.keys():
+            self.delete(key)
+
+
+class BufferedHits:
+    """Counts hits in process and writes them to the shared store at most every
+    HITS_FLUSH_INTERVAL seconds, so a cache read never takes a write lock or an extra
+    round trip. Counts not yet flushed when the process exits are lost."""
+
+    def _init_hits(self):
+        self.pending_hits = {}
+        self.hits_lock = threading.Lock()
+        self.hits_flushed_at = time.monotonic()
+
+    def _count_hit(self, key: str):
+        with self.hits_lock:
+            self.pending_hits[key] = self.pending_hits.get(key, 0) + 1
+            due = time.monotonic() - self.hits_flushed_at >= HITS_FLUSH_INTERVAL
+        if due:
+            self.flush_hits()
+
+    def flush_hits(self):
+        with self.hits_lock:
+            pending, self.pending_hits = self.pending_hits, {}
+            self.hits_flushed_at = time.monotonic()
+        if pending:
+            try:
+                self._write_hits(pending)
+            except Exception as e:
+                # Hit counts are diagnostics; losing a batch must not fail the read that flushed it
+                logging.warning(f"Could not flush {len(pending)} cache hit counts: {e!r}")
+
+    def _write_hits(self, pending: dict):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Per-process dict, the original behaviour.
+
+    Like the shared backends, entries older than `ttl` seconds are pruned from `set`, at
+    most every PRUNE_INTERVAL seconds. Past `max_entries` the least recently used entry
+    is dropped first."""
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.data = OrderedDict()
+        self.hits = {}
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.pruned_at = float("-inf")
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            self.hits[key] = self.hits.get(key, 0) + 1
+            self.data.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self.data[key] = entry
+        self.data.move_to_end(key)
+        while self.max_entries and len(self.data) > self.max_entries:
+            oldest, _ = self.data.popitem(last=False)
+            self.hits.pop(oldest, None)
+        if self.ttl and time.monotonic() - self.pruned_at >= PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> int:
+        self.pruned_at = time.monotonic()
+        cutoff = time.time() - self.ttl
+        expired = [k for k, e in list(self.data.items()) if e["timestamp"] < cutoff]
+        for key in expired:
+            self.delete(key)
+        return len(expired)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.hits.pop(key, None)
+
+    def keys(self, prefix=""):
+        return [k for k in list(self.data) if k.startswith(prefix)]
+
+    def entries(self, prefix=""):
+        now = time.time()
+        return [
+            {"key": k, "age_seconds": round(now - e["timestamp"], 1), "size_bytes": entry_size(e["data"]),
+             "hits": self.hits.get(k, 0)}
+            for k, e in list(self.data.items()) if k.startswith(prefix)
+        ]
+
+    def clear(self):
+        self.data.clear()
+        self.hits.clear()
+
+
+class SQLiteCache(BufferedHits, CacheBackend):
+    """On-disk cache shared by every worker on the same host.
+
+    Values are pickled with protocol 5, which copies NumPy buffers in as raw bytes rather
+    than converting them element by element. Rows older than `ttl` seconds are pruned
+    from `set`, at most every PRUNE_INTERVAL seconds, so the file stays bounded."""
+
+    def __init__(self, path: str, namespace: str, ttl: Optional[int] = None):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.pruned_at = float("-inf")
+        self.local = threading.local()
+        self._init_hits()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, timestamp REAL, data BLOB, "
+            "hits INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (namespace, key))"
+        )
+        if "hits" not in [row[1] for row in conn.execute("PRAGMA table_info(cache)")]:
+            conn.execute("ALTER TABLE cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, timestamp)")
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT timestamp, data FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        self._count_hit(key)
+        return {"timestamp": row[0], "data": pickle.loads(row[1])}
+
+    def set(self, key, entry):
+        self._conn().execute(
+            "INSERT INTO cache (namespace, key, timestamp, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data",
+            (self.namespace, key, entry["timestamp"], pickle.dumps(entry["data"], protocol=5))
+        )
+        if self.ttl and time.monotonic() - self.pruned_at >= PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> int:
+        self.pruned_at = time.monotonic()
+        return self._conn().execute(
+            "DELETE FROM cache WHERE namespace = ? AND timestamp < ?", (self.namespace, time.time() - self.ttl)
+        ).rowcount
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def keys(self, prefix=""):
+        rows = self._conn().execute(
+            "SELECT key FROM cache WHERE namespace = ? AND substr(key, 1, ?) = ?",
+            (self.namespace, len(prefix), prefix)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def _write_hits(self, pending):
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "UPDATE cache SET hits = hits + ? WHERE namespace = ? AND key = ?",
+                [(n, self.namespace, key) for key, n in pending.items()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def entries(self, prefix=""):
+        self.flush_hits()
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT key, timestamp, length(data), hits FROM cache WHERE namespace = ? AND substr(key, 1, ?) = ?",
+            (self.namespace, len(prefix), prefix)
+        ).fetchall()
+        return [{"key": k, "age_seconds": round(now - ts, 1), "size_bytes": size, "hits": hits} for k, ts, size, hits in rows]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+
+class KeyValueCache(BufferedHits, CacheBackend):
+    """Network key-value cache shared across hosts.
+
+    `client` only needs the redis-py subset get/set(ex=, nx=)/delete/scan_iter(match=)/
+    incr/expire, so a redis.Redis instance or LocalKVClient both work. Hit counters live
+    under a separate prefix so they never show up as cache keys, and expire with their entry."""
+
+    def __init__(self, client: Any, namespace: str, ttl: Optional[int] = None):
+        self.client = client
+        self.prefix = f"stocksense:{namespace}:"
+        self.hits_prefix = f"stocksense-hits:{namespace}:"
+        self.ttl = ttl
+        self._init_hits()
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        self._count_hit(key)
+        return pickle.loads(raw)
+
+    def set(self, key, entry):
+        self.client.set(self.prefix + key, pickle.dumps(entry, protocol=5), ex=self.ttl)
+        if self.ttl:
+            # INCR keeps an existing expiry, so the counter lives exactly as long as its entry
+            if not self.client.set(self.hits_prefix + key, 0, ex=self.ttl, nx=True):
+                self.client.expire(self.hits_prefix + key, self.ttl)
+
+    def _write_hits(self, pending):
+        for key, n in pending.items():
+            # A counter recreated after its entry was deleted still expires
+            if self.client.incr(self.hits_prefix + key, n) == n and self.ttl:
+                self.client.expire(self.hits_prefix + key, self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key, self.hits_prefix + key)
+
+    def entries(self, prefix=""):
+        self.flush_hits()
+        now = time.time()
+        result = []
+        for key in self.keys(prefix):
+            raw = self.client.get(self.prefix + key)
+            if raw is None:
+                continue
+            hits = self.client.get(self.hits_prefix + key)
+            result.append({
+                "key": key, "age_seconds": round(now - pickle.loads(raw)["timestamp"], 1),
+                "size_bytes": len(raw), "hits": int(hits) if hits is not None else 0
+            })
+        return result
+
+    def keys(self, prefix=""):
+        full_keys = self.client.scan_iter(match=f"{self.prefix}{prefix}*")
+        return [(k.decode() if isinstance(k, bytes) else k)[len(self.prefix):] for k in full_keys]
+
+
+class LocalKVClient:
+    """In-process stand-in for a redis client, for tests and single-node setups."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        with self.lock:
+            return self.data[key] if self._live(key) else None
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and self._live(key):
+                return None
+            self.data[key] = value
+            if ex:
+                self.expires[key] = time.time() + ex
+            else:
+                self.expires.pop(key, None)
+        return True
+
+    def expire(self, key, seconds):
+        with self.lock:
+            if not self._live(key):
+                return False
+            self.expires[key] = time.time() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            removed = 0
+            for key in keys:
+                if self._live(key):
+                    removed += 1
+                self.data.pop(key, None)
+                self.expires.pop(key, None)
+            return removed
+
+    def incr(self, key, amount=1):
+        with self.lock:
+            value = int(self.data[key]) + amount if self._live(key) else amount
+            self.data[key] = str(value).encode()
+            return value
+
+    def scan_iter(self, match="*"):
+        with self.lock:
+            return [k for k in list(self.data) if self._live(k) and fnmatch.fnmatchcase(k, match)]
+
+
+_KV_CLIENTS = {}
+
+
+def make_cache(namespace: str, backend: str = "memory", url: str = "", ttl: Optional[int] = None,
+               max_entries: Optional[int] = None) -> CacheBackend:
+    """`max_entries` bounds the per-process memory backend; shared backends are bounded by `ttl`."""
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteCache(url or "stocksense_cache.sqlite3", namespace, ttl=ttl)
+    if backend in ("redis", "local_kv"):
+        if url not in _KV_CLIENTS:
+            if backend == "local_kv":
+                _KV_CLIENTS[url] = LocalKVClient()
+            else:
+                try:
+                    import redis
+                except ImportError:
+                    raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+                _KV_CLIENTS[url] = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        return KeyValueCache(_KV_CLIENTS[url], namespace, ttl=ttl)
+    raise ValueError(f"Unknown cache backend '{backend}'")
@@ -0,0 +1,68 @@
+from typing import Optional
+
+import pandas as pd
+
+INTRADAY_INTERVALS = ["1m", "5m", "15m", "30m", "60m"]
+# Candles built locally from the daily series, keyed by yfinance interval name
+RESAMPLED_INTERVALS = {"1wk": "W-FRI", "1mo": "M"}
+SUPPORTED_INTERVALS = INTRADAY_INTERVALS + ["1d"] + list(RESAMPLED_INTERVALS)
+
+# Resolution picked for each period when the caller does not ask for one,
+# chosen so a chart needs no more than ~250 points
+AUTO_INTERVALS = {
+    "1d": "5m", "5d": "15m", "1mo": "1d", "3mo": "1d", "6mo": "1d", "ytd": "1d",
+    "1y": "1d", "2y": "1wk", "5y": "1mo", "10y": "1mo", "max": "1mo"
+}
+
+# Periods Yahoo serves intraday bars for: 1m covers the last 7 days, 60m the last
+# 730 and the other intraday intervals the last 60
+INTRADAY_PERIODS = {
+    "1m": ["1d", "5d"], "5m": ["1d", "5d", "1mo"], "15m": ["1d", "5d", "1mo"],
+    "30m": ["1d", "5d", "1mo"], "60m": ["1d", "5d", "1mo", "3mo", "6mo", "ytd", "1y"]
+}
+
+
+def choose_interval(period: str) -> str:
+    return AUTO_INTERVALS.get(period, "1d")
+
+
+def interval_available(interval: str, period: str) -> bool:
+    return interval not in INTRADAY_PERIODS or period in INTRADAY_PERIODS[interval]
+
+
+def resample_ohlcv(daily: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate daily bars into weekly/monthly candles indexed by each bucket's first session."""
+    if daily.empty:
+        return daily[["Open", "High", "Low", "Close", "Volume"]].copy()
+    index = daily.index.tz_localize(None) if daily.index.tz is not None else daily.index
+    buckets = index.to_period(RESAMPLED_INTERVALS[interval])
+    candles = daily.assign(Date=daily.index).groupby(buckets).agg(
+        Date=("Date", "first"), Open=("Open", "first"), High=("High", "max"),
+        Low=("Low", "min"), Close=("Close", "last"), Volume=("Volume", "sum")
+    )
+    return candles.set_index("Date")
+
+
+def update_candles(candles: Optional[pd.DataFrame], daily: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Extend previously built candles with new daily bars.
+
+    Only the last (possibly still open) bucket and anything after it is re-aggregated.
+    A daily series reaching further back than the cached candles, or with a different
+    index timezone, triggers a full rebuild."""
+    if (candles is None or candles.empty or daily.empty or candles.index.tz != daily.index.tz
+            or daily.index[0] < candles.index[0]):
+        return resample_ohlcv(daily, interval)
+    last_bucket_start = candles.index[-1]
+    if daily.index[-1] < last_bucket_start:
+        # Older snapshot than what is already aggregated
+        return candles
+    tail = resample_ohlcv(daily[daily.index >= last_bucket_start], interval)
+    return pd.concat([candles.iloc[:-1], tail])
+
+
+def slice_candles(candles: pd.DataFrame, start) -> pd.DataFrame:
+    """Candles covering `start` onwards, including the bucket that contains it."""
+    if candles.empty:
+        return candles
+    first = candles.index.searchsorted(start, side="right") - 1
+    return candles.iloc[max(first, 0):]
@@ -0,0 +1,195 @@
+import threading
+from collections import OrderedDict
+from typing import Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analytics import close_matrix
+
+
+def returns_matrix(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Daily simple returns on the union of trading days; a symbol without a bar that day counts as flat."""
+    closes = close_matrix(frames)
+    if closes.empty:
+        return closes
+    return closes.pct_change().iloc[1:].fillna(0.0)
+
+
+class CorrelationEngine:
+    """Rolling correlation of daily returns over the last `window` sessions.
+
+    Keeps the return rows plus running column sums and the cross-product matrix R^T R,
+    so a new session (or a new symbol) costs O(N^2) (resp. O(window * N)) instead of a
+    full O(window * N^2) recomputation. After every change the correlation matrix and a
+    top-k neighbour index are derived from the sums, so lookups are plain index reads.
+    The sums are rebuilt from scratch every `window` updates to shed rounding drift.
+
+    Symbols added on demand (not pinned) are evicted least recently looked up first once
+    `max_symbols` are tracked."""
+
+    def __init__(self, window: int = 250, k: int = 10, max_symbols: Optional[int] = None):
+        self.window = window
+        self.k = k
+        self.max_symbols = max_symbols
+        self.on_demand = OrderedDict()  # unpinned symbols, least recently used first
+        self.lock = threading.Lock()
+        self.dates = pd.DatetimeIndex([])
+        self.symbols: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.returns = np.zeros((0, 0))
+        self.sums = np.zeros(0)
+        self.cross = np.zeros((0, 0))
+        self.corr = np.zeros((0, 0))
+        self.neighbours = np.zeros((0, 0), dtype=np.int64)
+        self.updates_since_rebuild = 0
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.positions
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def as_of(self) -> Optional[pd.Timestamp]:
+        return self.dates[-1] if len(self.dates) else None
+
+    def update(self, returns: pd.DataFrame) -> str:
+        """Fold sessions from the last indexed one onwards into the sums. The last indexed
+        session is replaced as well, since it may have been taken from an intraday close.
+        Returns "rebuilt", "updated" or "unchanged"."""
+        with self.lock:
+            if (not len(self.dates) or self.dates[-1] not in returns.index
+                    or set(returns.columns) != set(self.symbols) or self.updates_since_rebuild >= self.window):
+                self._rebuild(returns)
+                return "rebuilt"
+            tail = returns.loc[returns.index >= self.dates[-1], self.symbols]
+            new = tail.to_numpy(dtype="float64")
+            if len(new) == 1 and np.array_equal(new[0], self.returns[-1]):
+                return "unchanged"
+
+            rows = np.vstack([self.returns[:-1], new])
+            removed = np.vstack([self.returns[-1:], rows[:-self.window]])
+            self.sums += new.sum(axis=0) - removed.sum(axis=0)
+            self.cross += new.T @ new - removed.T @ removed
+            self.returns = rows[-self.window:]
+            self.dates = self.dates[:-1].append(tail.index)[-self.window:]
+            self.updates_since_rebuild += 1
+            self._reindex()
+            return "updated"
+
+    def add_symbol(self, symbol: str, returns: pd.Series, pinned: bool = False) -> bool:
+        return symbol in self.add_symbols(returns.to_frame(symbol), [symbol] if pinned else ())
+
+    def add_symbols(self, returns: pd.DataFrame, pinned: Collection[str] = (),
+                    keep: Collection[str] = ()) -> List[str]:
+        """Track the columns of `returns` in one step, aligned to the indexed sessions (missing
+        days count as flat). Unpinned symbols outside the batch and `keep` are evicted to make
+        room; what still does not fit is left out. Returns the requested symbols now tracked."""
+        with self.lock:
+            if not len(self.dates):
+                return []
+            requested = list(returns.columns)
+            for symbol in requested:
+                self._touch(symbol)
+            new = [s for s in requested if s not in self.positions]
+            evicted = []
+            if self.max_symbols:
+                room = self.max_symbols - len(self.symbols)
+                evicted = [s for s in self.on_demand if s not in returns.columns and s not in keep]
+                evicted = evicted[:max(0, len(new) - room)]
+                new = new[:max(0, room + len(evicted))]
+                for symbol in evicted:
+                    del self.on_demand[symbol]
+                self._drop([self.positions[s] for s in evicted])
+            if new:
+                block = returns[new].reindex(self.dates).fillna(0.0).to_numpy(dtype="float64")
+                column = self.returns.T @ block
+                self.cross = np.block([[self.cross, column], [column.T, block.T @ block]])
+                self.sums = np.concatenate([self.sums, block.sum(axis=0)])
+                self.returns = np.hstack([self.returns, block])
+                self.symbols = self.symbols + new
+                self.on_demand.update((s, None) for s in new if s not in pinned)
+            if new or evicted:
+                self._reindex()
+            return [s for s in requested if s in self.positions]
+
+    def remove_symbol(self, symbol: str) -> bool:
+        with self.lock:
+            i = self.positions.get(symbol)
+            if i is None:
+                return False
+            self.on_demand.pop(symbol, None)
+            self._drop([i])
+            self._reindex()
+            return True
+
+    def mark_stale(self):
+        """Rebuild from scratch on the next update instead of folding in new sessions."""
+        with self.lock:
+            self.updates_since_rebuild = self.window
+
+    def similar(self, symbol: str, k: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        with self.lock:
+            i = self.positions.get(symbol)
+            if i is None:
+                return None
+            self._touch(symbol)
+            return [(self.symbols[j], float(self.corr[i, j])) for j in self.neighbours[i][:k or self.k]]
+
+    def pairwise(self, symbols: List[str]) -> Tuple[List[str], np.ndarray]:
+        with self.lock:
+            tracked = [s for s in symbols if s in self.positions]
+            for s in tracked:
+                self._touch(s)
+            idx = [self.positions[s] for s in tracked]
+            return tracked, self.corr[np.ix_(idx, idx)].copy()
+
+    def _touch(self, symbol: str):
+        if symbol in self.on_demand:
+            self.on_demand.move_to_end(symbol)
+
+    def _drop(self, indices: List[int]):
+        self.returns = np.delete(self.returns, indices, axis=1)
+        self.sums = np.delete(self.sums, indices)
+        self.cross = np.delete(np.delete(self.cross, indices, axis=0), indices, axis=1)
+        dropped = set(indices)
+        self.symbols = [s for i, s in enumerate(self.symbols) if i not in dropped]
+
+    def _rebuild(self, returns: pd.DataFrame):
+        returns = returns.iloc[-self.window:]
+        self.symbols = list(returns.columns)
+        self.on_demand = OrderedDict((s, None) for s in self.on_demand if s in returns.columns)
+        self.dates = returns.index
+        self.returns = np.ascontiguousarray(returns.to_numpy(dtype="float64"))
+        self.sums = self.returns.sum(axis=0)
+        self.cross = self.returns.T @ self.returns
+        self.updates_since_rebuild = 0
+        self._reindex()
+
+    def _reindex(self):
+        n, count = len(self.dates), len(self.symbols)
+        self.positions = {s: i for i, s in enumerate(self.symbols)}
+        if n < 2 or count == 0:
+            self.corr = np.zeros((count, count))
+            self.neighbours = np.zeros((count, 0), dtype=np.int64)
+            return
+        mean = self.sums / n
+        cov = self.cross / n - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        corr[~np.isfinite(corr)] = 0.0
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, 1.0)
+
+        k = min(self.k, count - 1)
+        scores = corr.copy()
+        np.fill_diagonal(scores, -np.inf)
+        if k > 0:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            neighbours = np.take_along_axis(top, order, axis=1)
+        else:
+            neighbours = np.zeros((count, 0), dtype=np.int64)
+        self.corr, self.neighbours = corr, neighbours
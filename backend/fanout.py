@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+from profiling import to_thread
+
+# Tasks that missed their request's deadline keep running here so their results
+# still land in the caches; holding a reference stops them being garbage collected.
+_BACKGROUND_TASKS = set()
+# Running tasks by key, so concurrent requests for the same symbol share one computation
+_IN_FLIGHT = {}
+
+
+def _finish_background(task: asyncio.Task):
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning(f"Background fan-out task failed: {task.exception()!r}")
+
+
+def _start(item: Any, worker: Callable[[Any], Awaitable[Any]], task_budget: float,
+           key: Optional[Callable[[Any], str]]) -> asyncio.Task:
+    task_key = key(item) if key else None
+    if task_key is not None and task_key in _IN_FLIGHT:
+        return _IN_FLIGHT[task_key]
+    task = asyncio.create_task(asyncio.wait_for(worker(item), task_budget))
+    if task_key is not None:
+        _IN_FLIGHT[task_key] = task
+        task.add_done_callback(lambda t: _IN_FLIGHT.pop(task_key, None))
+    return task
+
+
+async def fan_out(items: List[Any], worker: Callable[[Any], Awaitable[Any]], deadline: float,
+                  task_budget: float, fallback: Optional[Callable[[Any], Any]] = None,
+                  key: Optional[Callable[[Any], str]] = None) -> List[dict]:
+    """Run `worker` for every item concurrently and return after at most `deadline` seconds.
+
+    Each result is {"item", "status", "value"} in input order, with status:
+      fresh   - the worker finished in time
+      stale   - the worker is late or failed and `fallback(item)` supplied a cached value
+      pending - the worker is late and nothing is cached
+      error   - the worker failed and nothing is cached
+    Late workers keep running in the background for up to `task_budget` seconds in total.
+    Items with the same `key(item)` join the task already running for that key.
+    `fallback` usually reads a shared cache, so all fallbacks run together in one thread."""
+    tasks = [_start(item, worker, task_budget, key) for item in items]
+    if tasks:
+        await asyncio.wait(tasks, timeout=deadline)
+
+    def succeeded(task):
+        return task.done() and not task.cancelled() and task.exception() is None
+
+    missed = [item for item, task in zip(items, tasks) if not succeeded(task)]
+    fallbacks = iter(await to_thread(lambda: [fallback(i) for i in missed]) if fallback and missed else [])
+    results = []
+    for item, task in zip(items, tasks):
+        if succeeded(task):
+            results.append({"item": item, "status": "fresh", "value": task.result()})
+            continue
+        if not task.done():
+            if task not in _BACKGROUND_TASKS:
+                _BACKGROUND_TASKS.add(task)
+                task.add_done_callback(_finish_background)
+            status = "pending"
+        else:
+            status = "error"
+            if not task.cancelled():
+                logging.warning(f"Fan-out task for {item!r} failed: {task.exception()!r}")
+        value = next(fallbacks, None)
+        results.append({"item": item, "status": "stale" if value is not None else status, "value": value})
+    return results
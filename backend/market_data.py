@@ -0,0 +1,188 @@
+import json
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MARKET_TZ = "Asia/Kolkata"
+
+# Trading sessions per yfinance period string, used where a provider has to slice history itself
+PERIOD_SESSIONS = {
+    "1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252,
+    "2y": 504, "5y": 1260, "10y": 2520, "max": None
+}
+VALID_PERIODS = list(PERIOD_SESSIONS) + ["ytd"]
+
+
+class MarketDataProvider:
+    """Source of prices and news. Methods are blocking and are called from worker threads."""
+
+    name = "base"
+
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rng = random.Random(0)
+        self.rng_lock = threading.Lock()
+
+    def _simulate_latency(self):
+        if self.latency <= 0 and self.latency_jitter <= 0:
+            return
+        with self.rng_lock:
+            jitter = self.rng.uniform(0, self.latency_jitter)
+        time.sleep(self.latency + jitter)
+
+    def history(self, symbol: str, period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+        raise NotImplementedError
+
+    def batch_history(self, symbols: List[str], period: str = "2y", interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        return {s: self.history(s, period, interval) for s in symbols}
+
+    def latest_quote(self, symbol: str) -> Optional[dict]:
+        df = self.history(symbol, "5d")
+        if df.empty:
+            return None
+        price = float(df["Close"].iloc[-1])
+        prev = float(df["Close"].iloc[-2]) if len(df) > 1 else price
+        return {
+            "symbol": symbol, "price": price, "previous_close": prev,
+            "change_percent": ((price - prev) / prev) * 100 if prev else 0.0,
+            "timestamp": df.index[-1].isoformat()
+        }
+
+    def news(self, symbol: str) -> list:
+        raise NotImplementedError
+
+
+# yfinance error messages for a request Yahoo answered but cannot serve - an unknown symbol,
+# or a period or intraday range it refuses - as opposed to a failed request
+NO_DATA_ERRORS = (
+    "No data found", "No price data found", "No timezone found", "is invalid, must be one of",
+    "data not available for startTime", "The requested range must be within", "Invalid input"
+)
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def history(self, symbol, period="2y", interval="1d"):
+        import yfinance as yf
+        self._simulate_latency()
+        # Do NOT pass session= - modern yfinance uses curl_cffi internally.
+        # raise_errors so outages reach the caller's retries and circuit breaker instead of
+        # looking like an empty history; errors about the request itself stay an empty history
+        try:
+            return yf.Ticker(symbol).history(period=period, interval=interval, raise_errors=True)
+        except Exception as e:
+            message = str(e)
+            if any(m in message for m in NO_DATA_ERRORS) and "status_code" not in message:
+                return pd.DataFrame()
+            raise
+
+    def batch_history(self, symbols, period="2y", interval="1d"):
+        import yfinance as yf
+        if len(symbols) < 2:
+            return super().batch_history(symbols, period, interval)
+        self._simulate_latency()
+        raw = yf.download(symbols, period=period, interval=interval, group_by="ticker",
+                          threads=True, progress=False, auto_adjust=True)
+        frames = {}
+        for s in symbols:
+            if s in raw.columns.get_level_values(0):
+                frames[s] = raw[s].dropna(how="all")
+            else:
+                frames[s] = pd.DataFrame()
+        return frames
+
+    def news(self, symbol):
+        import yfinance as yf
+        self._simulate_latency()
+        return yf.Ticker(symbol).news or []
+
+
+class ReplayProvider(MarketDataProvider):
+    """Deterministic offline provider backed by files in `data_dir`:
+
+    <SYMBOL>.csv                daily bars (Date, Open, High, Low, Close, Volume)
+    <SYMBOL>_<interval>.csv     optional intraday bars (Datetime, ...)
+    news/<SYMBOL>.json          list of yfinance-shaped news items
+
+    Unknown symbols return an empty frame, like yfinance does."""
+
+    name = "replay"
+
+    def __init__(self, data_dir: str, latency: float = 0.0, latency_jitter: float = 0.0):
+        super().__init__(latency, latency_jitter)
+        self.data_dir = Path(data_dir)
+        self.frames = {}
+
+    def _load(self, name: str) -> pd.DataFrame:
+        if name not in self.frames:
+            path = self.data_dir / f"{name}.csv"
+            if path.exists():
+                df = pd.read_csv(path, index_col=0)
+                df.index = pd.to_datetime(df.index).tz_localize(MARKET_TZ)
+                self.frames[name] = df
+            else:
+                self.frames[name] = pd.DataFrame()
+        return self.frames[name]
+
+    def history(self, symbol, period="2y", interval="1d"):
+        self._simulate_latency()
+        df = self._load(symbol.upper() if interval == "1d" else f"{symbol.upper()}_{interval}")
+        if df.empty:
+            return df.copy()
+        if period == "ytd":
+            return df[df.index.year == df.index[-1].year].copy()
+        sessions = PERIOD_SESSIONS.get(period)
+        if sessions and interval != "1d":
+            # Intraday periods are counted in calendar days back from the last bar
+            return df[df.index >= df.index[-1].normalize() - pd.Timedelta(days=sessions * 7 // 5)].copy()
+        return df.iloc[-sessions:].copy() if sessions else df.copy()
+
+    def news(self, symbol):
+        self._simulate_latency()
+        path = self.data_dir / "news" / f"{symbol.upper()}.json"
+        return json.loads(path.read_text()) if path.exists() else []
+
+
+def make_provider(name: str = "yfinance", data_dir: str = "", latency: float = 0.0,
+                  latency_jitter: float = 0.0) -> MarketDataProvider:
+    if name == "yfinance":
+        return YFinanceProvider(latency, latency_jitter)
+    if name == "replay":
+        return ReplayProvider(data_dir or "replay_data", latency, latency_jitter)
+    raise ValueError(f"Unknown market data provider '{name}'")
+
+
+def generate_replay_data(data_dir: str, symbols: List[str], sessions: int = 756, end: str = "2026-01-30"):
+    """Write reproducible random-walk histories and news for `symbols` (e.g. "TCS.NS", "^NSEI")."""
+    root = Path(data_dir)
+    (root / "news").mkdir(parents=True, exist_ok=True)
+    dates = pd.bdate_range(end=end, periods=sessions)
+    for symbol in symbols:
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        start = rng.uniform(100, 4000)
+        close = start * np.exp(np.cumsum(rng.normal(0.0004, 0.017, sessions)))
+        open_ = close * (1 + rng.normal(0, 0.006, sessions))
+        spread = np.abs(rng.normal(0, 0.01, sessions))
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, sessions)
+        }, index=pd.Index(dates, name="Date"))
+        df.round(2).to_csv(root / f"{symbol.upper()}.csv")
+        news = [{
+            "title": f"{symbol} market update {i + 1}",
+            "url": f"https://example.com/{symbol}/{i}",
+            "provider": {"displayName": "Replay Wire"},
+            "providerPublishTime": int(dates[-1 - i].timestamp())
+        } for i in range(5)]
+        (root / "news" / f"{symbol.upper()}.json").write_text(json.dumps(news))
@@ -0,0 +1,207 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ModelBackend:
+    """Regressor used by the prediction engine. `y` may be 1-D or (n_samples, n_targets)."""
+
+    name = "base"
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "ModelBackend":
+        raise NotImplementedError
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict_interval(self, X: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Lower/upper prediction bounds, for backends that produce them."""
+        return None
+
+
+class RandomForestBackend(ModelBackend):
+    name = "random_forest"
+
+    def __init__(self, n_estimators: int = 50, max_depth: int = 12):
+        from sklearn.ensemble import RandomForestRegressor
+        self.model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, max_depth=max_depth, n_jobs=-1)
+
+    def fit(self, X, y):
+        self.model.fit(X, y)
+        return self
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    name = "hist_gb"
+
+    def __init__(self, max_iter: int = 100):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        self.max_iter = max_iter
+        self.make = lambda: HistGradientBoostingRegressor(max_iter=max_iter, random_state=42)
+        self.models = []
+
+    def fit(self, X, y):
+        # Histogram boosting is single-output, so each target column gets its own booster
+        targets = y.reshape(len(y), -1)
+        self.models = [self.make().fit(X, targets[:, i]) for i in range(targets.shape[1])]
+        self.multi_output = y.ndim > 1
+        return self
+
+    def predict(self, X):
+        preds = np.column_stack([m.predict(X) for m in self.models])
+        return preds if self.multi_output else preds[:, 0]
+
+
+class RidgeBackend(ModelBackend):
+    """Closed-form ridge regression on standardized features."""
+
+    name = "ridge"
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        self.x_mean = X.mean(axis=0)
+        self.x_std = X.std(axis=0)
+        self.x_std[self.x_std == 0] = 1.0
+        self.y_mean = y.mean(axis=0)
+        Xs = (X - self.x_mean) / self.x_std
+        gram = Xs.T @ Xs + self.alpha * np.eye(Xs.shape[1])
+        self.coef = np.linalg.solve(gram, Xs.T @ (y - self.y_mean))
+        return self
+
+    def predict(self, X):
+        return ((X - self.x_mean) / self.x_std) @ self.coef + self.y_mean
+
+
+class QuantileRidgeBackend(RidgeBackend):
+    """Ridge fit once, with prediction intervals from the empirical quantiles of its
+    training residuals."""
+
+    name = "quantile"
+
+    def __init__(self, alpha: float = 1.0, quantiles: Tuple[float, float] = (0.1, 0.9)):
+        super().__init__(alpha)
+        self.quantiles = quantiles
+
+    def fit(self, X, y):
+        super().fit(X, y)
+        residuals = y - self.predict(X)
+        self.residual_bounds = np.quantile(residuals, self.quantiles, axis=0)
+        return self
+
+    def predict_interval(self, X):
+        pred = self.predict(X)
+        return pred + self.residual_bounds[0], pred + self.residual_bounds[1]
+
+
+MODEL_BACKENDS = {
+    b.name: b for b in (RandomForestBackend, HistGradientBoostingBackend, RidgeBackend, QuantileRidgeBackend)
+}
+
+
+def get_model_backend(name: str) -> ModelBackend:
+    if name not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}', use one of {', '.join(MODEL_BACKENDS)}")
+    return MODEL_BACKENDS[name]()
+
+
+class ScaledModel:
+    """Min-max scales features and targets around a backend, as the prediction engine
+    always has, and returns predictions in the original target units."""
+
+    def __init__(self, backend: ModelBackend):
+        from sklearn.preprocessing import MinMaxScaler
+        self.backend = backend
+        self.scaler_X = MinMaxScaler()
+        self.scaler_y = MinMaxScaler()
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "ScaledModel":
+        self.target_shape = y.shape[1:]
+        X_scaled = self.scaler_X.fit_transform(X)
+        y_scaled = self.scaler_y.fit_transform(y.reshape(len(y), -1))
+        self.backend.fit(X_scaled, y_scaled if y.ndim > 1 else y_scaled.ravel())
+        return self
+
+    def _unscale(self, values: np.ndarray) -> np.ndarray:
+        n = len(values)
+        return self.scaler_y.inverse_transform(values.reshape(n, -1)).reshape((n,) + self.target_shape)
+
+    def predict(self, X: np.ndarray):
+        """Returns (predictions, (lower, upper) or None)."""
+        X_scaled = self.scaler_X.transform(X)
+        interval = self.backend.predict_interval(X_scaled)
+        pred = self._unscale(self.backend.predict(X_scaled))
+        return pred, (tuple(self._unscale(b) for b in interval) if interval else None)
+
+
+def walk_forward(name: str, X: np.ndarray, y: np.ndarray, folds: int = 5, test_size: int = 5,
+                 train_size: int = 400, gap: int = 0) -> Dict[str, float]:
+    """Refit on a rolling window (up to `train_size` rows, as the server does) and score the
+    following `test_size` rows, `folds` times.
+
+    `gap` rows are left out between training and test windows so forward-looking
+    targets of the last training rows cannot overlap the test period."""
+    fit_times, predict_times, errors, covered = [], [], [], []
+    for fold in range(folds):
+        end = len(X) - (folds - fold) * test_size
+        window = min(train_size, end - gap)
+        if window < 100:
+            continue
+        model = ScaledModel(get_model_backend(name))
+        start = time.perf_counter()
+        model.fit(X[end - gap - window:end - gap], y[end - gap - window:end - gap])
+        fit_times.append(time.perf_counter() - start)
+        y_test = y[end:end + test_size]
+        start = time.perf_counter()
+        pred, interval = model.predict(X[end:end + test_size])
+        predict_times.append(time.perf_counter() - start)
+        errors.append(np.mean(np.abs(pred - y_test) / np.abs(y_test)))
+        if interval:
+            covered.append(np.mean((y_test >= interval[0]) & (y_test <= interval[1])))
+    result = {
+        "fit_ms": round(float(np.mean(fit_times)) * 1000, 1) if fit_times else None,
+        "predict_ms": round(float(np.mean(predict_times)) * 1000, 2) if predict_times else None,
+        "mape_percent": round(float(np.mean(errors)) * 100, 2) if errors else None
+    }
+    if covered:
+        result["interval_coverage_percent"] = round(float(np.mean(covered)) * 100, 1)
+    return result
+
+
+def compare_backends(datasets: Dict[str, Tuple[np.ndarray, np.ndarray]], names: List[str], **kwargs) -> List[dict]:
+    return [{"symbol": symbol, "backend": name, **walk_forward(name, X, y, **kwargs)}
+            for symbol, (X, y) in datasets.items() for name in names]
+
+
+if __name__ == "__main__":
+    import argparse
+    from server import FORECAST_HORIZONS, get_stock_data, calculate_features, build_training_set, build_horizon_training_set
+
+    parser = argparse.ArgumentParser(description="Compare prediction model backends on the same symbols")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--backends", default=",".join(MODEL_BACKENDS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-size", type=int, default=5)
+    parser.add_argument("--target", choices=["horizons", "close"], default="horizons",
+                        help="forward close ratios for every forecast horizon, or the same-day close")
+    args = parser.parse_args()
+
+    datasets = {}
+    for symbol in args.symbols:
+        df = get_stock_data(symbol, "2y")
+        if df.empty:
+            print(f"{symbol}: no data, skipped")
+            continue
+        features = calculate_features(df)
+        datasets[symbol] = build_horizon_training_set(features)[:2] if args.target == "horizons" else build_training_set(features)
+    gap = max(FORECAST_HORIZONS) if args.target == "horizons" else 0
+    rows = compare_backends(datasets, args.backends.split(","), folds=args.folds, test_size=args.test_size, gap=gap)
+    print(f"{'symbol':<14}{'backend':<16}{'fit ms':>10}{'predict ms':>12}{'MAPE %':>10}{'coverage %':>12}")
+    for r in rows:
+        print(f"{r['symbol']:<14}{r['backend']:<16}{r['fit_ms']!s:>10}{r['predict_ms']!s:>12}"
+              f"{r['mape_percent']!s:>10}{r.get('interval_coverage_percent', '-')!s:>12}")
@@ -0,0 +1,112 @@
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def close_matrix(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Daily closes for every symbol aligned on the union of their trading days."""
+    series = {}
+    for symbol, df in frames.items():
+        if df.empty:
+            continue
+        index = df.index.tz_localize(None) if getattr(df.index, "tz", None) is not None else df.index
+        close = pd.Series(df["Close"].to_numpy(dtype="float64"), index=index.normalize())
+        series[symbol] = close[~close.index.duplicated(keep="last")]
+    if not series:
+        return pd.DataFrame()
+    # Carry prices over non-trading days of one exchange, and back-fill before a listing's first bar
+    return pd.DataFrame(series).sort_index().ffill().bfill()
+
+
+def lots_signature(lots: List[dict]) -> str:
+    key = sorted((l["symbol"], float(l["quantity"]), float(l["buy_price"]), str(l["buy_date"])) for l in lots)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def build_equity_curve(lots: List[dict], closes: pd.DataFrame, start: Optional[pd.Timestamp] = None) -> dict:
+    """Daily holdings value from the first purchase onwards.
+
+    Each lot is added to the holdings matrix on the first trading day on or after its
+    buy_date; cash_flow is the amount invested that day. Returns the curve frame and the
+    final holdings so the curve can be extended without replaying the lots."""
+    symbols = list(closes.columns)
+    buy_dates = pd.to_datetime([l["buy_date"] for l in lots], errors="coerce").tz_localize(None).normalize()
+    col = np.array([symbols.index(l["symbol"]) for l in lots], dtype=np.int64)
+    qty = np.array([l["quantity"] for l in lots], dtype="float64")
+    cost = qty * np.array([l["buy_price"] for l in lots], dtype="float64")
+
+    dates = closes.index
+    first = buy_dates.min() if start is None else start
+    dates = dates[dates >= first]
+    pos = dates.searchsorted(buy_dates)
+    active = (pos < len(dates)) & ~buy_dates.isna()
+
+    additions = np.zeros((len(dates), len(symbols)))
+    np.add.at(additions, (pos[active], col[active]), qty[active])
+    flows = np.zeros(len(dates))
+    np.add.at(flows, pos[active], cost[active])
+    holdings = np.cumsum(additions, axis=0)
+
+    values = (holdings * closes.loc[dates].to_numpy()).sum(axis=1)
+    curve = pd.DataFrame({"value": values, "cash_flow": flows}, index=dates)
+    curve["invested"] = curve["cash_flow"].cumsum()
+    curve["daily_return"] = daily_returns(curve["value"].to_numpy(), flows)
+    return {"curve": curve, "holdings": holdings[-1] if len(dates) else np.zeros(len(symbols)), "symbols": symbols}
+
+
+def extend_equity_curve(state: dict, closes: pd.DataFrame) -> dict:
+    """Recompute the last cached day (its close may have moved) and append newer days
+    using the final holdings, which no lot changes after the first build."""
+    curve = state["curve"]
+    base = curve.iloc[:-1]
+    dates = closes.index[closes.index >= curve.index[-1]]
+    values = closes.loc[dates, state["symbols"]].to_numpy() @ state["holdings"]
+    flows = np.zeros(len(dates))
+    flows[0] = curve["cash_flow"].iloc[-1]
+    tail = pd.DataFrame({"value": values, "cash_flow": flows}, index=dates)
+    tail["invested"] = curve["invested"].iloc[-1] + np.cumsum(flows) - flows[0]
+    previous = np.concatenate([base["value"].to_numpy()[-1:], values])
+    tail["daily_return"] = daily_returns(previous, np.concatenate([[0.0], flows]))[1:]
+    return {**state, "curve": pd.concat([base, tail])}
+
+
+def daily_returns(values: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """Return per day with that day's new money arriving at the start of the day:
+    V_t / (V_{t-1} + CF_t) - 1, with V_{-1} = 0. A lot bought away from the close
+    therefore books its buy-day gain or loss on its own cost, not on earlier capital."""
+    previous = np.concatenate([[0.0], values])[:-1]
+    base = previous + flows
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base > 0, values / base - 1, 0.0)
+
+
+def time_weighted_return(returns: np.ndarray) -> float:
+    return float(np.prod(1 + returns) - 1)
+
+
+def money_weighted_return(dates: pd.DatetimeIndex, flows: np.ndarray, final_value: float) -> Optional[float]:
+    """Annualized internal rate of return of the deposits against the final value (XIRR)."""
+    invested = flows > 0
+    if not invested.any() or final_value <= 0:
+        return None
+    years = np.asarray((dates[invested] - dates[invested][0]).days, dtype="float64") / 365.0
+    horizon = (dates[-1] - dates[invested][0]).days / 365.0
+    amounts = flows[invested]
+    if horizon <= 0:
+        return None
+
+    def npv(rate):
+        return final_value / (1 + rate) ** horizon - np.sum(amounts / (1 + rate) ** years)
+
+    lo, hi = -0.9999, 10.0
+    if npv(lo) * npv(hi) > 0:
+        return None
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if npv(lo) * npv(mid) <= 0:
+            hi = mid
+        else:
+            lo = mid
+    return float((lo + hi) / 2)
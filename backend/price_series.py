@@ -0,0 +1,62 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from market_data import MARKET_TZ
+
+OHLC_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+class PriceSeries:
+    """Compact OHLCV history for the caches.
+
+    Prices are one contiguous float32 block (one row per column), volume is int64 (a
+    missing volume is stored as 0) and the index is int64 epoch days for daily bars or
+    epoch seconds for intraday bars, in exchange-local time. Anything else yfinance
+    returns (Dividends, Stock Splits) is dropped."""
+
+    __slots__ = ("index", "unit", "ohlc", "volume")
+
+    def __init__(self, index: np.ndarray, unit: str, ohlc: np.ndarray, volume: np.ndarray):
+        self.index = index
+        self.unit = unit
+        self.ohlc = ohlc
+        self.volume = volume
+        for arr in (self.index, self.ohlc, self.volume):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PriceSeries":
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_convert(MARKET_TZ).tz_localize(None)
+        unit = "D" if len(index) and (index == index.normalize()).all() else "s"
+        return cls(
+            np.ascontiguousarray(index.values.astype(f"datetime64[{unit}]").astype(np.int64)),
+            unit,
+            np.ascontiguousarray(df[OHLC_COLUMNS].to_numpy(dtype=np.float32).T),
+            # A missing volume would otherwise cast to int64 min
+            np.ascontiguousarray(df["Volume"].fillna(0).to_numpy(dtype=np.int64))
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Pandas view over the stored arrays - columns are not copied and are read-only."""
+        columns = {name: self.ohlc[i] for i, name in enumerate(OHLC_COLUMNS)}
+        columns["Volume"] = self.volume
+        index = pd.DatetimeIndex(self.index.astype(f"datetime64[{self.unit}]").astype("datetime64[s]"), name="Date")
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.index) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.nbytes + self.ohlc.nbytes + self.volume.nbytes
+
+    def last_close(self) -> Optional[float]:
+        return float(self.ohlc[3, -1]) if len(self.index) else None
@@ -0,0 +1,174 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import pstats
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+_ACTIVE_PROFILE: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+# cProfile hooks a whole thread, so only one request at a time profiles the event loop itself
+_LOOP_PROFILER_LOCK = threading.Lock()
+# From 3.12 cProfile runs on sys.monitoring, which allows one profiler per process and sees
+# every thread - the event-loop profiler then covers to_thread work too
+_PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+
+def _start_profiler() -> Optional[cProfile.Profile]:
+    """An enabled profiler, or None if another profiling tool holds the hook."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.profilers = []
+        self.thread_cpu = 0.0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def run_in_thread(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        # Without a profiler of its own the call is still timed
+        profiler = _start_profiler() if _PER_THREAD_PROFILERS else None
+        cpu_start = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profiler:
+                profiler.disable()
+            with self.lock:
+                if not self.closed:
+                    if profiler:
+                        self.profilers.append(profiler)
+                    self.thread_cpu += time.thread_time() - cpu_start
+
+
+async def to_thread(func: Callable, *args, **kwargs) -> Any:
+    """asyncio.to_thread that also profiles the call when the current request is being profiled."""
+    profile = _ACTIVE_PROFILE.get()
+    if profile is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await asyncio.to_thread(profile.run_in_thread, func, args, kwargs)
+
+
+class ProfileBuffer:
+    """Most recent request profiles, oldest dropped first."""
+
+    def __init__(self, size: int = 50):
+        self.records = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self.lock:
+            self.records.append(record)
+
+    def list(self) -> list:
+        with self.lock:
+            return [{k: v for k, v in r.items() if k != "stats"} for r in reversed(self.records)]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self.lock:
+            return next((r for r in self.records if r["id"] == profile_id), None)
+
+
+def render_stats(stats: pstats.Stats, limit: int = 60) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def dump_stats(stats: pstats.Stats) -> bytes:
+    """Standard pstats file contents (loadable by pstats, snakeviz, ...)."""
+    import marshal
+    return marshal.dumps(stats.stats)
+
+
+class ProfilingMiddleware:
+    """Records a cProfile of sampled requests, and of requests whose X-Profile-Token header
+    matches `token`. Wall-clock time covers the handler on the event loop plus every
+    `to_thread` call it makes; CPU time is measured per thread. The event-loop profile
+    also sees other requests' coroutines that run while the profiled one awaits (and, from
+    Python 3.12, other requests' threads). When no profiler can be started only timings are
+    recorded; profiling never fails the request.
+
+    Only installed when profiling is enabled, so disabled deployments pay nothing."""
+
+    def __init__(self, app, buffer: ProfileBuffer, sample_rate: float = 0.0, token: str = ""):
+        self.app = app
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+
+    def _wants_profile(self, scope) -> bool:
+        if self.token:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile-token" and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        loop_profiler = None
+        if _LOOP_PROFILER_LOCK.acquire(blocking=False):
+            loop_profiler = _start_profiler()
+            if loop_profiler is None:
+                _LOOP_PROFILER_LOCK.release()
+        token = _ACTIVE_PROFILE.set(profile)
+        wall_start, loop_cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if loop_profiler:
+                loop_profiler.disable()
+                _LOOP_PROFILER_LOCK.release()
+            wall = time.perf_counter() - wall_start
+            loop_cpu = time.thread_time() - loop_cpu_start
+            _ACTIVE_PROFILE.reset(token)
+            with profile.lock:
+                profile.closed = True
+                profilers = ([loop_profiler] if loop_profiler else []) + profile.profilers
+            stats = None
+            try:
+                if profilers:
+                    stats = pstats.Stats(profilers[0])
+                    for p in profilers[1:]:
+                        stats.add(p)
+            except Exception as e:
+                logging.warning(f"Could not build profile for {profile.method} {profile.path}: {e!r}")
+            self.buffer.add({
+                "id": profile.id, "method": profile.method, "path": profile.path,
+                "status": status["code"], "started_at": profile.started_at,
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round((loop_cpu + profile.thread_cpu) * 1000, 2),
+                "thread_cpu_ms": round(profile.thread_cpu * 1000, 2),
+                "event_loop_profiled": loop_profiler is not None,
+                "stats": stats
+            })
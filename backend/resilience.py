@@ -0,0 +1,112 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no token became available in time and the upstream was never called."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every fetch thread in the process."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single probe
+    through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def cancel_probe(self):
+        """Give back a half-open probe that was allowed but never called the upstream."""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    logging.warning(f"Circuit breaker opened after {self.failures} upstream failures")
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+def call_with_retry(fn: Callable[[], Any], retries: int = 2, base_delay: float = 0.5,
+                    max_delay: float = 4.0, limiter: Optional[TokenBucket] = None,
+                    limit_wait: float = 10.0) -> Any:
+    """Call `fn`, retrying exceptions with full-jitter exponential backoff.
+
+    With a `limiter` every attempt, retries included, first takes a token. If none comes
+    within `limit_wait` seconds the last error is raised, or RateLimitExceeded if there
+    was no attempt yet."""
+    error = None
+    for attempt in range(retries + 1):
+        if limiter is not None and not limiter.acquire(timeout=limit_wait):
+            if error is None:
+                raise RateLimitExceeded(f"no upstream token within {limit_wait}s")
+            raise error
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            error = e
+            time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
@@ -1,13 +1,15 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, Header, Request
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, EmailStr, ValidationError
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
@@ -18,6 +20,23 @@ from contextlib import asynccontextmanager
 import asyncio
 import numpy as np
 import time
+import hmac
+import re
+import csv
+import io
+from resilience import TokenBucket, CircuitBreaker, RateLimitExceeded, call_with_retry
+from cache_backends import make_cache
+from market_data import MARKET_TZ, VALID_PERIODS, make_provider
+from model_backends import MODEL_BACKENDS, ScaledModel, get_model_backend
+from fanout import fan_out
+from portfolio_analytics import (
+    close_matrix, lots_signature, build_equity_curve, extend_equity_curve,
+    time_weighted_return, money_weighted_return
+)
+from profiling import ProfileBuffer, ProfilingMiddleware, to_thread, render_stats, dump_stats
+from price_series import PriceSeries
+from correlation import CorrelationEngine, returns_matrix
+from candles import INTRADAY_INTERVALS, INTRADAY_PERIODS, SUPPORTED_INTERVALS, choose_interval, interval_available, update_candles, slice_candles
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,22 +50,117 @@ db = client.stocksense
 USERS_COL = "users"
 PORTFOLIO_COL = "portfolio"
 ALERTS_COL = "alerts"
+PREDICTIONS_COL = "predictions"
+PREDICTION_LEASES_COL = "prediction_leases"
+
+# Most lots / alerts one account may hold - every view reads up to this many, so they all agree
+MAX_PORTFOLIO_LOTS = 2000
+MAX_ALERTS = 500
 
-# Global caches for speed
-PREDICTION_CACHE = {}
-MARKET_DATA_CACHE = {}
+# Global caches for speed - "memory" (per worker), "sqlite" (shared per host, CACHE_URL is the
+# database path) or "redis" (shared per cluster, CACHE_URL is the redis URL)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_URL = os.environ.get("CACHE_URL", "")
 CACHE_EXPIRY = 3600  # 1 hour
 MARKET_CACHE_EXPIRY = 900 # 15 minutes for trending data
+HISTORY_CACHE_EXPIRY = 1800
+MAX_CHART_POINTS = 250
+
+# Aggregate endpoints answer within FANOUT_DEADLINE seconds with whatever finished, while late
+# per-symbol work keeps filling the caches for up to FANOUT_TASK_BUDGET seconds
+FANOUT_DEADLINE = float(os.environ.get("FANOUT_DEADLINE", 3.0))
+FANOUT_TASK_BUDGET = float(os.environ.get("FANOUT_TASK_BUDGET", 30.0))
+CACHE_RETENTION = 7 * 24 * 3600  # how long the caches keep entries around as stale fallbacks
+PREDICTION_CACHE = make_cache("predictions", CACHE_BACKEND, CACHE_URL, ttl=CACHE_RETENTION)
+MARKET_DATA_CACHE = make_cache("market_data", CACHE_BACKEND, CACHE_URL, ttl=CACHE_RETENTION)
+# Holds one multi-year curve per user; the memory backend keeps only the most recently used ones
+PORTFOLIO_HISTORY_MAX_ENTRIES = int(os.environ.get("PORTFOLIO_HISTORY_MAX_ENTRIES", 1000))
+PORTFOLIO_HISTORY_CACHE = make_cache("portfolio_history", CACHE_BACKEND, CACHE_URL, ttl=CACHE_RETENTION,
+                                     max_entries=PORTFOLIO_HISTORY_MAX_ENTRIES)
+
+# Upstream resilience
+# "suffix_<BASE>" -> exchange suffix that last resolved, "miss_<history key>" -> last "no data" result
+SYMBOL_CACHE = make_cache("symbols", CACHE_BACKEND, CACHE_URL, ttl=CACHE_RETENTION)
+# Every cache by namespace, for the admin cache routes
+CACHE_NAMESPACES = {
+    "predictions": PREDICTION_CACHE, "market_data": MARKET_DATA_CACHE,
+    "portfolio_history": PORTFOLIO_HISTORY_CACHE, "symbols": SYMBOL_CACHE
+}
+NEGATIVE_CACHE_EXPIRY = int(os.environ.get("NEGATIVE_CACHE_EXPIRY", 600))
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", 2))
+UPSTREAM_RATE_LIMIT_WAIT = float(os.environ.get("UPSTREAM_RATE_LIMIT_WAIT", 10))
+UPSTREAM_RATE_LIMITER = TokenBucket(
+    rate=float(os.environ.get("UPSTREAM_RATE_PER_SEC", 5)),
+    capacity=float(os.environ.get("UPSTREAM_RATE_BURST", 10))
+)
+UPSTREAM_BREAKER = CircuitBreaker(
+    failure_threshold=int(os.environ.get("UPSTREAM_BREAKER_THRESHOLD", 5)),
+    reset_timeout=float(os.environ.get("UPSTREAM_BREAKER_RESET", 60))
+)
+
+# Market data provider - "yfinance" or "replay" (offline files in REPLAY_DATA_DIR, for load tests)
+MARKET_DATA = make_provider(
+    os.environ.get("MARKET_DATA_PROVIDER", "yfinance"),
+    data_dir=os.environ.get("REPLAY_DATA_DIR", str(ROOT_DIR / "replay_data")),
+    latency=float(os.environ.get("PROVIDER_LATENCY_MS", 0)) / 1000,
+    latency_jitter=float(os.environ.get("PROVIDER_LATENCY_JITTER_MS", 0)) / 1000
+)
+
+# Prediction model backends (see model_backends.MODEL_BACKENDS) - the dashboard can use a cheaper one
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "random_forest")
+DASHBOARD_MODEL_BACKEND = os.environ.get("DASHBOARD_MODEL_BACKEND", MODEL_BACKEND)
+# "multi_horizon" trains one model on forward targets for every horizon (in trading sessions);
+# "trend_scaled" is the older single-target fit extrapolated with the recent 5-day trend
+FORECAST_MODE = os.environ.get("FORECAST_MODE", "multi_horizon")
+FORECAST_HORIZONS = [3, 7, 15, 30]
+# Predictions are persisted in PREDICTIONS_COL so restarts and other workers reuse them. A worker
+# about to train a symbol takes a lease in PREDICTION_LEASES_COL; the others poll the store for its
+# result, and take over once the lease expires
+PREDICTION_STORE_TTL = int(os.environ.get("PREDICTION_STORE_TTL", 24 * 3600))
+PREDICTION_LEASE_SECONDS = float(os.environ.get("PREDICTION_LEASE_SECONDS", 120))
+PREDICTION_LEASE_POLL = 0.25
+WORKER_ID = uuid.uuid4().hex
+
+# Similar-stocks engine over daily returns of CORRELATION_UNIVERSE (plus symbols looked up since,
+# least recently used evicted past CORRELATION_MAX_SYMBOLS). Built at startup, then refreshed once per
+# weekday at CORRELATION_REFRESH_AT exchange time, after the close
+CORRELATION_UNIVERSE = [s.strip().upper() for s in os.environ.get(
+    "CORRELATION_UNIVERSE",
+    "RELIANCE,TCS,INFY,HDFCBANK,ICICIBANK,SBIN,AXISBANK,LT,ITC,BHARTIARTL,WIPRO,MARUTI,TITAN,ASIANPAINT,"
+    "KOTAKBANK,BAJFINANCE,HINDUNILVR,SUNPHARMA,TATAMOTORS,ONGC"
+).split(",") if s.strip()]
+CORRELATION_WINDOW = int(os.environ.get("CORRELATION_WINDOW", 250))
+CORRELATION_TOP_K = int(os.environ.get("CORRELATION_TOP_K", 10))
+CORRELATION_REFRESH_AT = os.environ.get("CORRELATION_REFRESH_AT", "16:00")
+CORRELATION_MAX_SYMBOLS = int(os.environ.get("CORRELATION_MAX_SYMBOLS", 1000))
+CORRELATION_PERIOD = "2y" if CORRELATION_WINDOW <= 450 else "5y"
+CORRELATIONS = CorrelationEngine(CORRELATION_WINDOW, CORRELATION_TOP_K, CORRELATION_MAX_SYMBOLS)
+CORRELATION_REFRESH_NOW = asyncio.Event()
 
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'stockmarket-secret-key-2024-secure-32-byte-key-minimum')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
+# Admin API - disabled unless ADMIN_TOKEN is set; callers send it as X-Admin-Token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Request profiling - off by default. When enabled, PROFILE_SAMPLE_RATE of requests plus any
+# request with an X-Profile-Token header equal to ADMIN_TOKEN are profiled
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_BUFFER = ProfileBuffer(int(os.environ.get("PROFILE_BUFFER_SIZE", 50)))
+
+# Cache warm-up jobs started from the admin API, by id; only the most recent ones are kept
+WARMUP_JOBS = {}
+WARMUP_JOBS_KEPT = 20
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 4))
+
 # Load Stock database from CSV
 STOCKS_DB = []
+STOCK_NAMES = {}  # symbol -> company name
 def load_stock_database():
-    global STOCKS_DB
+    global STOCKS_DB, STOCK_NAMES
     csv_path = ROOT_DIR / 'stock database.csv'
     if csv_path.exists():
         try:
@@ -63,6 +177,7 @@ def load_stock_database():
                     **s,
                     "_search_str": f"{str(s['symbol']).lower()} {str(s['name']).lower()}"
                 })
+            STOCK_NAMES = {str(s["symbol"]).upper(): s["name"] for s in STOCKS_DB}
             print(f"Loaded and optimized {len(STOCKS_DB)} stocks from CSV")
         except Exception as e:
             print(f"Error loading stock database: {e}")
@@ -74,7 +189,17 @@ def load_stock_database():
 async def lifespan(app):
     print("Server starting - Connecting to MongoDB")
     load_stock_database()
+    try:
+        await asyncio.wait_for(asyncio.gather(
+            db[PREDICTIONS_COL].create_index("created_at", expireAfterSeconds=PREDICTION_STORE_TTL),
+            db[PREDICTION_LEASES_COL].create_index("expires_at", expireAfterSeconds=0)
+        ), 10)
+    except Exception as e:
+        logging.warning(f"Could not create prediction store indexes: {e!r}")
+    correlation_task = asyncio.create_task(correlation_refresh_loop()) if CORRELATION_UNIVERSE else None
     yield
+    if correlation_task:
+        correlation_task.cancel()
     print("Server shutting down - Closing MongoDB connection")
     client.close()
 
@@ -93,6 +218,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, buffer=PROFILE_BUFFER, sample_rate=PROFILE_SAMPLE_RATE, token=ADMIN_TOKEN)
+
 @app.get("/", include_in_schema=False)
 async def root_redirect():
     from starlette.responses import RedirectResponse
@@ -159,6 +287,9 @@ class AlertResponse(BaseModel):
     is_active: bool
     created_at: str
 
+ALERT_TYPES = ["price_above", "price_below", "pnl_above", "pnl_below"]
+BULK_IMPORT_MAX_ROWS = 2000  # per request; account limits are MAX_PORTFOLIO_LOTS and MAX_ALERTS
+
 class PredictionResponse(BaseModel):
     symbol: str
     current_price: float
@@ -168,6 +299,13 @@ class PredictionResponse(BaseModel):
     confidence: float
     prediction_date: str
 
+class CacheWarmupRequest(BaseModel):
+    symbols: List[str]
+    periods: List[str] = ["5d", "2y"]
+    predictions: bool = True
+    model: Optional[str] = None
+    refresh: bool = False
+
 # ================= AUTH HELPERS =================
 
 def hash_password(password: str) -> str:
@@ -204,43 +342,229 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# ================= BULK IMPORT HELPERS =================
+
+async def read_bulk_rows(request: Request) -> List[dict]:
+    """Rows from a JSON list (or {"items": [...]}), a text/csv body or a multipart CSV upload."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the CSV as a 'file' field")
+        text = (await upload.read()).decode("utf-8-sig")
+    elif "csv" in content_type:
+        text = (await request.body()).decode("utf-8-sig")
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON list or CSV")
+        rows = payload.get("items") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise HTTPException(status_code=400, detail="Expected a list of objects")
+        text = None
+    if text is not None:
+        reader = csv.DictReader(io.StringIO(text))
+        rows = [
+            {k.strip().lower().replace(" ", "_"): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+            for row in reader
+        ]
+    if not rows:
+        raise HTTPException(status_code=400, detail="No rows to import")
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_IMPORT_MAX_ROWS} rows per import")
+    return rows
+
+def validate_bulk_rows(rows: List[dict], model: Any, check: Any) -> tuple:
+    # Returns ([(row_index, item)], [per-row result or None]) - symbols are checked against STOCK_NAMES
+    valid, results = [], []
+    for i, row in enumerate(rows):
+        try:
+            item = model(**row)
+        except ValidationError as e:
+            results.append({"row": i + 1, "status": "invalid", "error": "; ".join(
+                f"{'.'.join(str(l) for l in err['loc'])}: {err['msg']}" for err in e.errors()
+            )})
+            continue
+        item.symbol = item.symbol.strip().upper()
+        error = check(item)
+        if not error and STOCK_NAMES and item.symbol.replace(".NS", "").replace(".BO", "") not in STOCK_NAMES:
+            error = f"Unknown symbol '{item.symbol}'"
+        if error:
+            results.append({"row": i + 1, "status": "invalid", "error": error})
+            continue
+        valid.append((i, item))
+        results.append(None)
+    return valid, results
+
+async def ensure_capacity(collection: str, user_id: str, adding: int, limit: int, what: str):
+    existing = await db[collection].count_documents({"user_id": user_id})
+    if existing + adding > limit:
+        raise HTTPException(
+            status_code=400, detail=f"An account can hold at most {limit} {what}; it has {existing}, adding {adding}"
+        )
+
+async def bulk_insert(collection: str, rows: List[tuple], results: List[Optional[dict]], ordered: bool):
+    """insert_many `rows` ([(row_index, doc)]) and fill in their results; with ordered=True
+    Mongo stops at the first failed document and the rest are reported as skipped."""
+    failed = {}
+    try:
+        if rows:
+            await db[collection].insert_many([doc for _, doc in rows], ordered=ordered)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+    first_failure = min(failed) if failed else None
+    for n, (i, doc) in enumerate(rows):
+        if n in failed:
+            results[i] = {"row": i + 1, "status": "failed", "error": failed[n]}
+        elif ordered and first_failure is not None and n > first_failure:
+            results[i] = {"row": i + 1, "status": "skipped", "error": "Not written after an earlier failure"}
+        else:
+            results[i] = {"row": i + 1, "status": "created", "id": doc["id"]}
+    return {
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "failed": sum(1 for r in results if r["status"] != "created"),
+        "results": results
+    }
+
 # ================= STOCK DATA HELPERS =================
 
-def get_stock_data(symbol: str, period: str = "2y") -> Any:
-    import yfinance as yf
+def get_stock_data(symbol: str, period: str = "2y", interval: str = "1d") -> Any:
+    cache_key = f"hist_{symbol}_{period}" if interval == "1d" else f"hist_{symbol}_{period}_{interval}"
+    stale = MARKET_DATA_CACHE.get(cache_key)
+    if stale and time.time() - stale["timestamp"] < HISTORY_CACHE_EXPIRY:
+        return as_frame(stale["data"])
 
-    cache_key = f"hist_{symbol}_{period}"
-    if cache_key in MARKET_DATA_CACHE:
-        entry = MARKET_DATA_CACHE[cache_key]
-        if time.time() - entry["timestamp"] < 1800:
-            return entry["data"]
+    # Symbols that recently resolved to nothing are not retried until the miss expires
+    miss = SYMBOL_CACHE.get(f"miss_{cache_key}")
+    if miss and time.time() - miss["timestamp"] < NEGATIVE_CACHE_EXPIRY:
+        return pd.DataFrame()
 
     # Normalize symbol - strip any existing suffix first
     base_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
     symbols_to_try = [f"{base_symbol}.NS", f"{base_symbol}.BO"]
 
+    # Indices (^NSEI, ^BSESN) are not listed with an exchange suffix
+    if symbol.startswith("^"):
+        symbols_to_try = [symbol.upper()]
     # If caller already passed a suffixed symbol, try that first
-    if symbol.upper().endswith(".NS") or symbol.upper().endswith(".BO"):
+    elif symbol.upper().endswith(".NS") or symbol.upper().endswith(".BO"):
         symbols_to_try = [symbol.upper()] + [s for s in symbols_to_try if s != symbol.upper()]
+    # Otherwise start with the exchange that resolved last time
+    elif (known_suffix := SYMBOL_CACHE.get(f"suffix_{base_symbol}")):
+        known = f"{base_symbol}{known_suffix['data']}"
+        symbols_to_try = [known] + [s for s in symbols_to_try if s != known]
 
-    df = pd.DataFrame()
+    upstream_failed = False
     for attempt_symbol in symbols_to_try:
+        if not UPSTREAM_BREAKER.allow():
+            logging.warning(f"{attempt_symbol}: circuit open, skipping upstream fetch")
+            upstream_failed = True
+            break
         try:
-            # Do NOT pass session= - modern yfinance uses curl_cffi internally
-            ticker = yf.Ticker(attempt_symbol)
-            df = ticker.history(period=period)
+            df = call_with_retry(lambda: MARKET_DATA.history(attempt_symbol, period, interval), retries=UPSTREAM_RETRIES,
+                                 limiter=UPSTREAM_RATE_LIMITER, limit_wait=UPSTREAM_RATE_LIMIT_WAIT)
+            UPSTREAM_BREAKER.record_success()
             if not df.empty:
                 logging.info(f"Fetched {attempt_symbol} successfully (period={period})")
-                MARKET_DATA_CACHE[cache_key] = {"timestamp": time.time(), "data": df}
-                return df
+                SYMBOL_CACHE.set(f"suffix_{base_symbol}", {"timestamp": time.time(), "data": attempt_symbol[len(base_symbol):]})
+                series = PriceSeries.from_frame(df)
+                MARKET_DATA_CACHE.set(cache_key, {"timestamp": time.time(), "data": series})
+                return series.to_frame()
             else:
                 logging.warning(f"{attempt_symbol}: No price data found (period={period})")
+        except RateLimitExceeded:
+            logging.warning(f"{attempt_symbol}: rate limit wait exceeded")
+            UPSTREAM_BREAKER.cancel_probe()
+            upstream_failed = True
+            break
         except Exception as e:
+            UPSTREAM_BREAKER.record_failure()
+            upstream_failed = True
             logging.warning(f"{attempt_symbol} failed: {e}")
 
+    # A symbol that had data before is not unknown now - serve the expired copy rather than a miss
+    if stale:
+        logging.warning(f"Serving stale data for '{symbol}' (period={period})")
+        return as_frame(stale["data"])
+    if not upstream_failed:
+        SYMBOL_CACHE.set(f"miss_{cache_key}", {"timestamp": time.time(), "data": None})
     logging.error(f"All attempts failed for symbol '{symbol}' (period={period})")
     return pd.DataFrame()
 
+def prefetch_stock_data(symbols: List[str], periods: List[str]):
+    """Fill the history caches for `symbols` with one batched upstream call per period.
+    Symbols the batch does not resolve go through get_stock_data's per-exchange lookup."""
+    for period in periods:
+        tickers = {}
+        for symbol in dict.fromkeys(symbols):
+            entry = MARKET_DATA_CACHE.get(f"hist_{symbol}_{period}")
+            if entry and time.time() - entry["timestamp"] < HISTORY_CACHE_EXPIRY:
+                continue
+            miss = SYMBOL_CACHE.get(f"miss_hist_{symbol}_{period}")
+            if miss and time.time() - miss["timestamp"] < NEGATIVE_CACHE_EXPIRY:
+                continue
+            base_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
+            known_suffix = SYMBOL_CACHE.get(f"suffix_{base_symbol}")
+            ticker = symbol.upper() if symbol.upper() != base_symbol else f"{base_symbol}{known_suffix['data'] if known_suffix else '.NS'}"
+            tickers[ticker] = symbol
+        if not tickers:
+            continue
+        frames = {}
+        if UPSTREAM_BREAKER.allow():
+            try:
+                frames = call_with_retry(lambda: MARKET_DATA.batch_history(list(tickers), period), retries=UPSTREAM_RETRIES,
+                                         limiter=UPSTREAM_RATE_LIMITER, limit_wait=UPSTREAM_RATE_LIMIT_WAIT)
+                UPSTREAM_BREAKER.record_success()
+            except RateLimitExceeded:
+                UPSTREAM_BREAKER.cancel_probe()
+            except Exception as e:
+                UPSTREAM_BREAKER.record_failure()
+                logging.warning(f"Batch prefetch of {len(tickers)} symbols failed (period={period}): {e}")
+        for ticker, symbol in tickers.items():
+            df = frames.get(ticker)
+            if df is not None and not df.empty:
+                base_symbol = ticker.split(".")[0]
+                SYMBOL_CACHE.set(f"suffix_{base_symbol}", {"timestamp": time.time(), "data": ticker[len(base_symbol):]})
+                MARKET_DATA_CACHE.set(f"hist_{symbol}_{period}", {"timestamp": time.time(), "data": PriceSeries.from_frame(df)})
+            else:
+                get_stock_data(symbol, period)
+
+def as_frame(data: Any) -> Any:
+    # Histories are cached as compact PriceSeries; shared caches may still hold older DataFrames
+    return data.to_frame() if isinstance(data, PriceSeries) else data
+
+def get_cached_close(symbol: str, period: str = "5d") -> Optional[float]:
+    # Last known close regardless of age, used when fresh data misses a fan-out deadline
+    entry = MARKET_DATA_CACHE.get(f"hist_{symbol}_{period}")
+    if not entry:
+        return None
+    if isinstance(entry["data"], PriceSeries):
+        return entry["data"].last_close()
+    df = entry["data"]
+    return float(df["Close"].iloc[-1]) if not df.empty else None
+
+def get_candles(symbol: str, period: str = "1y", interval: str = "1d") -> Any:
+    if interval in INTRADAY_INTERVALS:
+        return get_stock_data(symbol, period, interval)
+    daily = get_stock_data(symbol, period)
+    if interval == "1d" or daily.empty:
+        return daily
+    # Coarse candles are kept per symbol and interval across periods and only the tail is rebuilt.
+    # Keyed like the daily histories they extend, so TCS.BO never continues TCS.NS candles
+    cache_key = f"candles_{symbol}_{interval}"
+    entry = MARKET_DATA_CACHE.get(cache_key)
+    candles = update_candles(as_frame(entry["data"]) if entry else None, daily, interval)
+    MARKET_DATA_CACHE.set(cache_key, {"timestamp": time.time(), "data": PriceSeries.from_frame(candles)})
+    return slice_candles(candles, daily.index[0])
+
 def calculate_rsi(series: Any, period: int = 14) -> Any:
     delta = series.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
@@ -249,7 +573,8 @@ def calculate_rsi(series: Any, period: int = 14) -> Any:
     return 100 - (100 / (1 + rs))
 
 def calculate_features(df: Any) -> Any:
-    df = df.copy()
+    # Cached prices are float32; indicators are computed on a float64 copy
+    df = df.astype({c: "float64" for c in ["Open", "High", "Low", "Close"]})
     df['MA5'] = df['Close'].rolling(window=5).mean()
     df['MA20'] = df['Close'].rolling(window=20).mean()
     df['MA50'] = df['Close'].rolling(window=50).mean()
@@ -269,28 +594,42 @@ def calculate_features(df: Any) -> Any:
     df['Momentum'] = df['Close'] - df['Close'].shift(10)
     return df.dropna()
 
-def train_base_model(df: Any):
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.preprocessing import MinMaxScaler
-    features = ['MA5', 'MA20', 'MA50', 'EMA12', 'EMA26', 'MACD', 'Signal', 'RSI', 'BB_Width', 'Volatility', 'Volume', 'Returns', 'Momentum']
-    X = df[features].values
-    y = df['Close'].values
-    scaler_X = MinMaxScaler()
-    scaler_y = MinMaxScaler()
-    X_scaled = scaler_X.fit_transform(X)
-    y_scaled = scaler_y.fit_transform(y.reshape(-1, 1))
-    model = RandomForestRegressor(n_estimators=50, random_state=42, max_depth=12, n_jobs=-1)
-    train_size = min(len(X_scaled), 400)
-    model.fit(X_scaled[-train_size:], y_scaled[-train_size:].ravel())
-    last_features = X_scaled[-1].reshape(1, -1)
-    pred_scaled = model.predict(last_features)
-    base_pred = scaler_y.inverse_transform(pred_scaled.reshape(-1, 1))[0][0]
-    return base_pred, df['Close'].iloc[-1], df['Volatility'].iloc[-1]
+FEATURE_COLUMNS = ['MA5', 'MA20', 'MA50', 'EMA12', 'EMA26', 'MACD', 'Signal', 'RSI', 'BB_Width', 'Volatility', 'Volume', 'Returns', 'Momentum']
+
+def build_training_set(df: Any):
+    return df[FEATURE_COLUMNS].values, df['Close'].values
+
+def train_base_model(df: Any, model: str = MODEL_BACKEND):
+    X, y = build_training_set(df)
+    train_size = min(len(X), 400)
+    fitted = ScaledModel(get_model_backend(model)).fit(X[-train_size:], y[-train_size:])
+    pred, pred_range = fitted.predict(X[-1:])
+    base_range = (pred_range[0][0], pred_range[1][0]) if pred_range else None
+    return pred[0], df['Close'].iloc[-1], df['Volatility'].iloc[-1], base_range
+
+def build_horizon_training_set(df: Any):
+    """Features with one target column per forecast horizon: the close `h` sessions ahead
+    as a ratio of today's close. Rows whose furthest target is still unknown are dropped
+    from training; the latest row is returned separately to forecast from."""
+    X = df[FEATURE_COLUMNS].values
+    close = df['Close'].values
+    Y = np.column_stack([df['Close'].shift(-h).values / close for h in FORECAST_HORIZONS])
+    known = ~np.isnan(Y).any(axis=1)
+    return X[known], Y[known], X[-1:]
+
+def train_horizon_model(df: Any, model: str = MODEL_BACKEND):
+    # All horizons are fitted together (natively multi-output for the forest and ridge backends)
+    X, Y, X_last = build_horizon_training_set(df)
+    train_size = min(len(X), 400)
+    fitted = ScaledModel(get_model_backend(model)).fit(X[-train_size:], Y[-train_size:])
+    ratios, ratio_range = fitted.predict(X_last)
+    ratio_range = (ratio_range[0][0], ratio_range[1][0]) if ratio_range else None
+    return ratios[0], ratio_range, df['Close'].iloc[-1], df['Volatility'].iloc[-1]
 
 def predict_stock_price(df: Any, days: int = 30) -> dict:
     df = calculate_features(df)
     if len(df) < 50: return None
-    base_pred, current_price, vol_val = train_base_model(df)
+    base_pred, current_price, vol_val, _ = train_base_model(df)
     recent_trend = (df['Close'].iloc[-1] - df['Close'].iloc[-5]) / df['Close'].iloc[-5]
     day_factor = days / 30.0
     predicted_price = base_pred * (1 + (recent_trend * day_factor * 0.4))
@@ -305,36 +644,156 @@ def predict_stock_price(df: Any, days: int = 30) -> dict:
         "days": days
     }
 
-async def get_multi_timeframe_predictions(symbol: str) -> dict:
-    now = time.time()
-    if symbol in PREDICTION_CACHE:
-        entry = PREDICTION_CACHE[symbol]
-        if now - entry["timestamp"] < CACHE_EXPIRY: return entry["data"]
-    df = await asyncio.to_thread(get_stock_data, symbol, "2y")
+def format_prediction(current_price: float, predicted_price: float, days: int, vol_val: float, bounds=None) -> dict:
+    change_percent = ((predicted_price - current_price) / current_price) * 100
+    confidence = min(max(92.0 - (days/2.0) - (vol_val/current_price * 100), 65), 98)
+    prediction = {
+        "current_price": round(current_price, 2),
+        "predicted_price": round(predicted_price, 2),
+        "change_percent": round(change_percent, 2),
+        "trend": "bullish" if change_percent > 1.5 else "bearish" if change_percent < -1.5 else "neutral",
+        "confidence": round(confidence, 1),
+        "days": days
+    }
+    if bounds:
+        prediction["lower"] = round(bounds[0], 2)
+        prediction["upper"] = round(bounds[1], 2)
+    return prediction
+
+async def load_stored_predictions(cache_key: str) -> Optional[dict]:
+    try:
+        doc = await db[PREDICTIONS_COL].find_one({"_id": cache_key})
+    except Exception as e:
+        logging.warning(f"Prediction store read failed for {cache_key}: {e!r}")
+        return None
+    if doc and time.time() - doc["timestamp"] < CACHE_EXPIRY:
+        await to_thread(PREDICTION_CACHE.set, cache_key, {"timestamp": doc["timestamp"], "data": doc["predictions"]})
+        return doc["predictions"]
+    return None
+
+async def store_predictions(cache_key: str, symbol: str, model: str, predictions: dict, timestamp: float):
+    try:
+        await db[PREDICTIONS_COL].replace_one({"_id": cache_key}, {
+            "symbol": symbol.upper().split(".")[0], "model": model, "predictions": predictions,
+            "timestamp": timestamp, "created_at": datetime.now(timezone.utc)
+        }, upsert=True)
+    except Exception as e:
+        logging.warning(f"Prediction store write failed for {cache_key}: {e!r}")
+
+async def claim_prediction_lease(cache_key: str) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        # Matches only an expired lease; if a live one exists the upsert collides on _id
+        await db[PREDICTION_LEASES_COL].find_one_and_update(
+            {"_id": cache_key, "expires_at": {"$lt": now}},
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=PREDICTION_LEASE_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+    except Exception as e:
+        logging.warning(f"Prediction lease claim failed for {cache_key}: {e!r}")
+        return True
+
+async def release_prediction_lease(cache_key: str):
+    try:
+        await db[PREDICTION_LEASES_COL].delete_one({"_id": cache_key, "owner": WORKER_ID})
+    except Exception as e:
+        logging.warning(f"Prediction lease release failed for {cache_key}: {e!r}")
+
+async def get_multi_timeframe_predictions(symbol: str, model: str = MODEL_BACKEND) -> dict:
+    cache_key = f"{symbol}_{model}"
+    entry = await to_thread(PREDICTION_CACHE.get, cache_key)
+    if entry and time.time() - entry["timestamp"] < CACHE_EXPIRY: return entry["data"]
+    stored = await load_stored_predictions(cache_key)
+    if stored: return stored
+    deadline = time.monotonic() + PREDICTION_LEASE_SECONDS
+    while not await claim_prediction_lease(cache_key) and time.monotonic() < deadline:
+        await asyncio.sleep(PREDICTION_LEASE_POLL)
+        stored = await load_stored_predictions(cache_key)
+        if stored: return stored
+    try:
+        # The previous holder may have stored its result just before we claimed the lease
+        stored = await load_stored_predictions(cache_key)
+        if stored: return stored
+        predictions = await compute_predictions(symbol, model)
+        if predictions:
+            now = time.time()
+            await to_thread(PREDICTION_CACHE.set, cache_key, {"timestamp": now, "data": predictions})
+            await store_predictions(cache_key, symbol, model, predictions, now)
+    finally:
+        # Released only once the result is stored, so waiters find it instead of retraining
+        await release_prediction_lease(cache_key)
+    return predictions
+
+async def compute_predictions(symbol: str, model: str) -> Optional[dict]:
+    df = await to_thread(get_stock_data, symbol, "2y")
     if df.empty: return None
-    df_ready = await asyncio.to_thread(calculate_features, df)
-    if len(df_ready) < 50: return None
-    base_pred, current_price, vol_val = await asyncio.to_thread(train_base_model, df_ready)
-    timeframes = [3, 7, 15, 30]
+    df_ready = await to_thread(calculate_features, df)
     predictions = {}
-    recent_trend = (df_ready['Close'].iloc[-1] - df_ready['Close'].iloc[-5]) / df_ready['Close'].iloc[-5]
-    for days in timeframes:
-        day_factor = days / 30.0
-        predicted_price = base_pred * (1 + (recent_trend * day_factor * 0.4))
-        change_percent = ((predicted_price - current_price) / current_price) * 100
-        confidence = min(max(92.0 - (days/2.0) - (vol_val/current_price * 100), 65), 98)
-        predictions[f"{days}d"] = {
-            "current_price": round(current_price, 2),
-            "predicted_price": round(predicted_price, 2),
-            "change_percent": round(change_percent, 2),
-            "trend": "bullish" if change_percent > 1.5 else "bearish" if change_percent < -1.5 else "neutral",
-            "confidence": round(confidence, 1),
-            "days": days
-        }
-    if predictions:
-        PREDICTION_CACHE[symbol] = {"timestamp": now, "data": predictions}
-        return predictions
-    return None
+    if FORECAST_MODE == "multi_horizon":
+        if len(df_ready) < 50 + max(FORECAST_HORIZONS): return None
+        ratios, ratio_range, current_price, vol_val = await to_thread(train_horizon_model, df_ready, model)
+        for i, days in enumerate(FORECAST_HORIZONS):
+            bounds = (current_price * ratio_range[0][i], current_price * ratio_range[1][i]) if ratio_range else None
+            predictions[f"{days}d"] = format_prediction(current_price, current_price * ratios[i], days, vol_val, bounds)
+    else:
+        if len(df_ready) < 50: return None
+        base_pred, current_price, vol_val, base_range = await to_thread(train_base_model, df_ready, model)
+        recent_trend = (df_ready['Close'].iloc[-1] - df_ready['Close'].iloc[-5]) / df_ready['Close'].iloc[-5]
+        for days in FORECAST_HORIZONS:
+            scale = 1 + (recent_trend * (days / 30.0) * 0.4)
+            bounds = (base_range[0] * scale, base_range[1] * scale) if base_range else None
+            predictions[f"{days}d"] = format_prediction(current_price, base_pred * scale, days, vol_val, bounds)
+    return predictions or None
+
+async def refresh_correlations():
+    symbols = list(dict.fromkeys(CORRELATION_UNIVERSE + CORRELATIONS.symbols))
+    # One batched upstream call for every history not already cached, instead of one call per symbol
+    await to_thread(prefetch_stock_data, symbols, [CORRELATION_PERIOD])
+    frames = await to_thread(lambda: {s: get_stock_data(s, CORRELATION_PERIOD) for s in symbols})
+    frames = {s: df for s, df in frames.items() if not df.empty}
+    if len(frames) < 2:
+        return
+    status = await to_thread(lambda: CORRELATIONS.update(returns_matrix(frames)))
+    logging.info(f"Correlation index {status}: {len(CORRELATIONS)} symbols as of {CORRELATIONS.as_of}")
+
+def seconds_until_correlation_refresh(now: Optional[pd.Timestamp] = None) -> float:
+    now = now or pd.Timestamp.now(tz=MARKET_TZ)
+    hour, minute = (int(part) for part in CORRELATION_REFRESH_AT.split(":"))
+    at = now.replace(hour=hour, minute=minute, second=0, microsecond=0, nanosecond=0)
+    while at <= now or at.weekday() >= 5:
+        at += pd.Timedelta(days=1)
+    return (at - now).total_seconds()
+
+async def correlation_refresh_loop():
+    while True:
+        try:
+            await refresh_correlations()
+        except Exception as e:
+            logging.warning(f"Correlation refresh failed: {e!r}")
+        try:
+            await asyncio.wait_for(CORRELATION_REFRESH_NOW.wait(), seconds_until_correlation_refresh())
+        except asyncio.TimeoutError:
+            pass
+        CORRELATION_REFRESH_NOW.clear()
+
+async def track_correlation_symbols(symbols: List[str]) -> Tuple[List[str], List[str]]:
+    # Adds symbols outside the index in one batch, evicting only symbols not asked for here.
+    # Returns the symbols now tracked and those with history that did not fit
+    missing = [s for s in symbols if s not in CORRELATIONS]
+    returns = pd.DataFrame()
+    if missing:
+        if CORRELATIONS.as_of is None:
+            raise HTTPException(status_code=503, detail="Correlation index is still building")
+        await to_thread(prefetch_stock_data, missing, [CORRELATION_PERIOD])
+        frames = await to_thread(lambda: {s: get_stock_data(s, CORRELATION_PERIOD) for s in missing})
+        returns = await to_thread(returns_matrix, {s: df for s, df in frames.items() if not df.empty})
+        if not returns.empty:
+            pinned = [s for s in returns.columns if s in CORRELATION_UNIVERSE]
+            await to_thread(CORRELATIONS.add_symbols, returns, pinned, symbols)
+    return [s for s in symbols if s in CORRELATIONS], [s for s in returns.columns if s not in CORRELATIONS]
 
 def calculate_risk_score(returns: Any) -> dict:
     volatility = returns.std() * np.sqrt(252)
@@ -410,79 +869,117 @@ async def search_stocks(q: str):
     return [{"symbol": s["symbol"], "name": s["name"]} for s in results[:10]]
 
 @api_router.get("/stocks/{symbol}")
-async def get_stock_details(symbol: str, period: str = "1y"):
-    df = await asyncio.to_thread(get_stock_data, symbol, period)
+async def get_stock_details(symbol: str, period: str = "1y", interval: Optional[str] = None):
+    if period not in VALID_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported period, use one of {', '.join(VALID_PERIODS)}")
+    interval = interval or choose_interval(period)
+    if interval not in SUPPORTED_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval, use one of {', '.join(SUPPORTED_INTERVALS)}")
+    if not interval_available(interval, period):
+        raise HTTPException(status_code=400, detail=f"{interval} candles are only available for periods {', '.join(INTRADAY_PERIODS[interval])}")
+    df = await to_thread(get_stock_data, symbol, period)
     if df.empty:
         raise HTTPException(status_code=404, detail="Stock not found or no data available")
     
+    candles = await to_thread(get_candles, symbol, period, interval)
+    if candles.empty:
+        # Provider has no intraday bars for this symbol - fall back to daily
+        interval, candles = "1d", df
+    date_format = "%Y-%m-%dT%H:%M" if interval in INTRADAY_INTERVALS else "%Y-%m-%d"
     chart_data = []
-    for idx, row in df.iterrows():
+    for idx, row in candles.iloc[-MAX_CHART_POINTS:].iterrows():
         chart_data.append({
-            "date": idx.strftime("%Y-%m-%d"),
+            "date": idx.strftime(date_format),
             "open": round(row["Open"], 2), "high": round(row["High"], 2),
             "low": round(row["Low"], 2), "close": round(row["Close"], 2),
             "volume": int(row["Volume"])
         })
     
-    current_price = df["Close"].iloc[-1]
-    prev_close = df["Close"].iloc[-2] if len(df) > 1 else current_price
+    closes = df["Close"].astype("float64")
+    current_price = closes.iloc[-1]
+    prev_close = closes.iloc[-2] if len(df) > 1 else current_price
     change = current_price - prev_close
     change_percent = (change / prev_close) * 100
-    risk = calculate_risk_score(df["Close"].pct_change().dropna())
+    risk = calculate_risk_score(closes.pct_change().dropna())
     
     return {
         "symbol": symbol, "current_price": round(current_price, 2),
         "change": round(change, 2), "change_percent": round(change_percent, 2),
-        "high_52w": round(df["High"].max(), 2), "low_52w": round(df["Low"].min(), 2),
+        "high_52w": round(float(df["High"].max()), 2), "low_52w": round(float(df["Low"].min()), 2),
         "volume": int(df["Volume"].iloc[-1]), "avg_volume": int(df["Volume"].mean()),
-        "risk": risk, "chart_data": chart_data[-250:]
+        "risk": risk, "interval": interval, "chart_data": chart_data
     }
 
 @api_router.get("/stocks/{symbol}/predictions")
-async def get_all_predictions(symbol: str):
-    predictions = await get_multi_timeframe_predictions(symbol)
+async def get_all_predictions(symbol: str, model: Optional[str] = None):
+    model = model or MODEL_BACKEND
+    if model not in MODEL_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown model, use one of {', '.join(MODEL_BACKENDS)}")
+    predictions = await get_multi_timeframe_predictions(symbol, model)
     if not predictions:
         raise HTTPException(status_code=404, detail="Stock not found or insufficient data")
-    return {"symbol": symbol, "predictions": predictions, "generated_at": datetime.now(timezone.utc).isoformat()}
+    return {"symbol": symbol, "model": model, "predictions": predictions, "generated_at": datetime.now(timezone.utc).isoformat()}
+
+@api_router.get("/stocks/{symbol}/similar")
+async def get_similar_stocks(symbol: str, k: int = 10):
+    base_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
+    tracked, no_room = await track_correlation_symbols([base_symbol])
+    if no_room:
+        raise HTTPException(status_code=503, detail="Correlation index is full")
+    if not tracked:
+        raise HTTPException(status_code=404, detail="Stock not found or no data available")
+    similar = CORRELATIONS.similar(base_symbol, max(1, min(k, CORRELATION_TOP_K)))
+    return {
+        "symbol": base_symbol, "as_of": CORRELATIONS.as_of.strftime("%Y-%m-%d"), "window": len(CORRELATIONS.dates),
+        "similar": [
+            {"symbol": s, "name": STOCK_NAMES.get(s), "correlation": round(c, 4)} for s, c in similar
+        ]
+    }
 
 @api_router.get("/dashboard/predictions")
 async def get_dashboard_predictions(current_user: dict = Depends(get_current_user)):
     top_stocks = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "SBIN", "AXISBANK", "LT"]
-    async def process_symbol(symbol):
-        try:
-            preds = await get_multi_timeframe_predictions(symbol)
-            if preds: return {"symbol": symbol, "predictions": preds}
-        except Exception: pass
-        return None
-    tasks = [process_symbol(s) for s in top_stocks]
-    results = await asyncio.gather(*tasks)
-    return [r for r in results if r]
+    def cached_predictions(symbol):
+        entry = PREDICTION_CACHE.get(f"{symbol}_{DASHBOARD_MODEL_BACKEND}")
+        return entry["data"] if entry else None
+    results = await fan_out(
+        top_stocks, lambda s: get_multi_timeframe_predictions(s, DASHBOARD_MODEL_BACKEND),
+        FANOUT_DEADLINE, FANOUT_TASK_BUDGET, fallback=cached_predictions,
+        key=lambda s: f"predictions_{s}_{DASHBOARD_MODEL_BACKEND}"
+    )
+    ready = [{"symbol": r["item"], "predictions": r["value"], "status": r["status"]} for r in results if r["value"]]
+    pending = [{"symbol": r["item"], "predictions": None, "status": r["status"]} for r in results if r["status"] == "pending"]
+    return ready + pending
 
 @api_router.get("/market/trending")
 async def get_trending_stocks():
     now = time.time()
     trending_symbols = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "SBIN", "ITC", "BHARTIARTL"]
     async def fetch_trending(symbol):
-        if symbol in MARKET_DATA_CACHE:
-            entry = MARKET_DATA_CACHE[symbol]
-            if now - entry["timestamp"] < MARKET_CACHE_EXPIRY: return entry["data"]
-        try:
-            df = await asyncio.to_thread(get_stock_data, symbol, "5d")
-            if not df.empty:
-                current, prev = df["Close"].iloc[-1], df["Close"].iloc[0]
-                data = {"symbol": symbol, "price": round(current, 2), "change_percent": round(((current - prev) / prev) * 100, 2)}
-                MARKET_DATA_CACHE[symbol] = {"timestamp": now, "data": data}
-                return data
-        except Exception: pass
+        entry = await to_thread(MARKET_DATA_CACHE.get, symbol)
+        if entry and now - entry["timestamp"] < MARKET_CACHE_EXPIRY: return entry["data"]
+        df = await to_thread(get_stock_data, symbol, "5d")
+        if not df.empty:
+            current, prev = float(df["Close"].iloc[-1]), float(df["Close"].iloc[0])
+            data = {"symbol": symbol, "price": round(current, 2), "change_percent": round(((current - prev) / prev) * 100, 2)}
+            await to_thread(MARKET_DATA_CACHE.set, symbol, {"timestamp": now, "data": data})
+            return data
         return None
-    tasks = [fetch_trending(s) for s in trending_symbols]
-    results = await asyncio.gather(*tasks)
-    return [r for r in results if r]
+    def cached_trending(symbol):
+        entry = MARKET_DATA_CACHE.get(symbol)
+        return entry["data"] if entry else None
+    results = await fan_out(trending_symbols, fetch_trending, FANOUT_DEADLINE, FANOUT_TASK_BUDGET,
+                            fallback=cached_trending, key=lambda s: f"trending_{s}")
+    ready = [{**r["value"], "status": r["status"]} for r in results if r["value"]]
+    # Late or failed symbols with nothing cached are flagged so the client can retry them
+    unavailable = [{"symbol": r["item"], "price": None, "change_percent": None, "status": r["status"]}
+                   for r in results if not r["value"] and r["status"] in ("pending", "error")]
+    return ready + unavailable
 
 @api_router.get("/market/movers")
 async def get_market_movers():
     # Helper to get both gainers and losers based on live trend data
-    results = await get_trending_stocks()
+    results = [r for r in await get_trending_stocks() if r["change_percent"] is not None]
     # Sort results by change_percent
     sorted_results = sorted(results, key=lambda x: x["change_percent"], reverse=True)
     gainers = [r for r in sorted_results if r["change_percent"] > 0]
@@ -537,15 +1034,12 @@ def parse_yf_news(raw_news):
 
 @api_router.get("/market/news")
 async def get_market_news():
-    import yfinance as yf
     try:
         # Fetch news from broad market indices and top stocks to represent whole market news
         tickers = ["^NSEI", "^BSESN", "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS"]
         parsed_news = []
         
-        for t in tickers:
-            tkr = yf.Ticker(t)
-            n = tkr.news
+        for n in await asyncio.gather(*[to_thread(MARKET_DATA.news, t) for t in tickers]):
             if n:
                 parsed_news.extend(parse_yf_news(n))
                 
@@ -567,15 +1061,12 @@ async def get_market_news():
 
 @api_router.get("/stocks/{symbol}/news")
 async def get_stock_news(symbol: str):
-    import yfinance as yf
     # Normalize symbol for YF
     base_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
     try:
-        tkr = yf.Ticker(f"{base_symbol}.NS")
-        news = tkr.news
+        news = await to_thread(MARKET_DATA.news, f"{base_symbol}.NS")
         if not news:
-            tkr = yf.Ticker(base_symbol)
-            news = tkr.news
+            news = await to_thread(MARKET_DATA.news, base_symbol)
         return parse_yf_news(news[:15]) if news else []
     except Exception as e:
         logging.error(f"Error fetching news for {symbol}: {e}")
@@ -585,6 +1076,7 @@ async def get_stock_news(symbol: str):
 
 @api_router.post("/portfolio/add")
 async def add_to_portfolio(item: PortfolioItem, current_user: dict = Depends(get_current_user)):
+    await ensure_capacity(PORTFOLIO_COL, current_user["user_id"], 1, MAX_PORTFOLIO_LOTS, "portfolio lots")
     item_id = str(uuid.uuid4())
     new_item = {
         "id": item_id,
@@ -598,17 +1090,40 @@ async def add_to_portfolio(item: PortfolioItem, current_user: dict = Depends(get
     await db[PORTFOLIO_COL].insert_one(new_item)
     return {"id": item_id, "message": "Added to portfolio"}
 
+@api_router.post("/portfolio/bulk")
+async def bulk_add_to_portfolio(request: Request, background_tasks: BackgroundTasks, ordered: bool = True,
+                                current_user: dict = Depends(get_current_user)):
+    rows = await read_bulk_rows(request)
+    def check(item):
+        if item.quantity <= 0 or item.buy_price <= 0:
+            return "quantity and buy_price must be positive"
+        if pd.isna(pd.to_datetime(item.buy_date, errors="coerce")):
+            return f"Invalid buy_date '{item.buy_date}'"
+    valid, results = validate_bulk_rows(rows, PortfolioItem, check)
+    await ensure_capacity(PORTFOLIO_COL, current_user["user_id"], len(valid), MAX_PORTFOLIO_LOTS, "portfolio lots")
+    created_at = datetime.now(timezone.utc).isoformat()
+    docs = [(i, {
+        "id": str(uuid.uuid4()), "user_id": current_user["user_id"], "symbol": item.symbol,
+        "quantity": item.quantity, "buy_price": item.buy_price, "buy_date": item.buy_date, "created_at": created_at
+    }) for i, item in valid]
+    response = await bulk_insert(PORTFOLIO_COL, docs, results, ordered)
+    created = [doc for i, doc in docs if results[i]["status"] == "created"]
+    if created:
+        # Warm the prices the portfolio view and its equity curve will ask for next
+        first_buy = pd.to_datetime([d["buy_date"] for d in created], errors="coerce").min().tz_localize(None)
+        background_tasks.add_task(prefetch_stock_data, sorted({d["symbol"] for d in created}), ["5d", history_period_for(first_buy)])
+    return response
+
 @api_router.get("/portfolio")
 async def get_portfolio(current_user: dict = Depends(get_current_user)):
     cursor = db[PORTFOLIO_COL].find({"user_id": current_user["user_id"]})
-    items = await cursor.to_list(length=100)
+    items = await cursor.to_list(length=MAX_PORTFOLIO_LOTS)
     
-    async def process_item(item):
-        try:
-            df = await asyncio.to_thread(get_stock_data, item["symbol"], "5d")
-            current_price = df["Close"].iloc[-1] if not df.empty else item["buy_price"]
-        except Exception: current_price = item["buy_price"]
-        
+    async def fetch_price(item):
+        df = await to_thread(get_stock_data, item["symbol"], "5d")
+        return float(df["Close"].iloc[-1]) if not df.empty else None
+
+    def build_item(item, current_price, status):
         invested = item["quantity"] * item["buy_price"]
         current_value = item["quantity"] * current_price
         pnl = current_value - invested
@@ -617,10 +1132,15 @@ async def get_portfolio(current_user: dict = Depends(get_current_user)):
             "buy_price": item["buy_price"], "buy_date": item["buy_date"],
             "current_price": round(current_price, 2), "invested": round(invested, 2),
             "current_value": round(current_value, 2), "pnl": round(pnl, 2),
-            "pnl_percent": round((pnl / invested) * 100 if invested > 0 else 0, 2)
+            "pnl_percent": round((pnl / invested) * 100 if invested > 0 else 0, 2),
+            "status": status
         }
     
-    portfolio_items = await asyncio.gather(*[process_item(i) for i in items])
+    results = await fan_out(items, fetch_price, FANOUT_DEADLINE, FANOUT_TASK_BUDGET,
+                            fallback=lambda i: get_cached_close(i["symbol"]),
+                            key=lambda i: f"price_{i['symbol']}")
+    # Without any known price the item is valued at cost
+    portfolio_items = [build_item(r["item"], r["value"] if r["value"] is not None else r["item"]["buy_price"], r["status"]) for r in results]
     total_invested = sum(i["invested"] for i in portfolio_items)
     total_current = sum(i["current_value"] for i in portfolio_items)
     total_pnl = total_current - total_invested
@@ -629,11 +1149,107 @@ async def get_portfolio(current_user: dict = Depends(get_current_user)):
         "items": portfolio_items,
         "summary": {
             "total_invested": round(total_invested, 2), "total_current": round(total_current, 2),
-            "total_pnl": round(total_pnl, 2), "total_pnl_percent": round((total_pnl / total_invested) * 100 if total_invested > 0 else 0, 2)
+            "total_pnl": round(total_pnl, 2), "total_pnl_percent": round((total_pnl / total_invested) * 100 if total_invested > 0 else 0, 2),
+            "complete": all(i["status"] == "fresh" for i in portfolio_items)
         },
         "allocation": [{"symbol": i["symbol"], "value": i["current_value"], "percentage": round((i["current_value"] / total_current) * 100, 1) if total_current > 0 else 0} for i in portfolio_items]
     }
 
+def history_period_for(start: Any) -> str:
+    # Shortest yfinance period that still reaches back to `start`
+    days = (pd.Timestamp.now().normalize() - start).days
+    for period, span in (("1y", 365), ("2y", 730), ("5y", 1826), ("10y", 3652)):
+        if days < span - 7:
+            return period
+    return "max"
+
+def compute_portfolio_history(user_id: str, lots: List[dict], frames: Dict[str, Any], benchmark: str) -> dict:
+    closes = close_matrix({s: df for s, df in frames.items() if s != benchmark})
+    bench = close_matrix({benchmark: frames.get(benchmark, pd.DataFrame())})
+    lots = [l for l in lots if l["symbol"] in closes.columns]
+    if closes.empty or not lots:
+        return None
+
+    # Reuse yesterday's curve for the same set of lots and only extend it with new sessions
+    signature = lots_signature(lots)
+    entry = PORTFOLIO_HISTORY_CACHE.get(user_id)
+    state = entry["data"] if entry and entry["data"]["signature"] == signature else None
+    last_buy = pd.to_datetime([l["buy_date"] for l in lots], errors="coerce").max()
+    if (state and len(state["curve"]) > 1 and state["curve"].index[-1] in closes.index
+            and state["symbols"] == list(closes.columns) and last_buy <= state["curve"].index[-1]):
+        state = extend_equity_curve(state, closes)
+    else:
+        state = {**build_equity_curve(lots, closes), "signature": signature}
+    PORTFOLIO_HISTORY_CACHE.set(user_id, {"timestamp": time.time(), "data": state})
+
+    curve = state["curve"]
+    if not bench.empty:
+        bench_close = bench[benchmark].reindex(curve.index, method="ffill").bfill()
+        curve = curve.assign(benchmark_return=bench_close / bench_close.iloc[0] - 1)
+    twr = time_weighted_return(curve["daily_return"].to_numpy())
+    mwr = money_weighted_return(curve.index, curve["cash_flow"].to_numpy(), curve["value"].iloc[-1])
+    benchmark_return = curve["benchmark_return"].iloc[-1] if "benchmark_return" in curve else None
+    return {
+        "equity_curve": [
+            {
+                "date": d.strftime("%Y-%m-%d"), "value": round(row.value, 2), "invested": round(row.invested, 2),
+                "daily_return": round(row.daily_return * 100, 4),
+                "benchmark_return": round(row.benchmark_return * 100, 4) if "benchmark_return" in curve else None
+            } for d, row in zip(curve.index, curve.itertuples())
+        ],
+        "summary": {
+            "start_date": curve.index[0].strftime("%Y-%m-%d"), "end_date": curve.index[-1].strftime("%Y-%m-%d"),
+            "current_value": round(curve["value"].iloc[-1], 2), "total_invested": round(curve["invested"].iloc[-1], 2),
+            "time_weighted_return": round(twr * 100, 2),
+            "money_weighted_return": round(mwr * 100, 2) if mwr is not None else None,
+            "benchmark": benchmark,
+            "benchmark_return": round(benchmark_return * 100, 2) if benchmark_return is not None else None,
+            "excess_return": round((twr - benchmark_return) * 100, 2) if benchmark_return is not None else None
+        }
+    }
+
+@api_router.get("/portfolio/history")
+async def get_portfolio_history(benchmark: str = "^NSEI", current_user: dict = Depends(get_current_user)):
+    cursor = db[PORTFOLIO_COL].find({"user_id": current_user["user_id"]})
+    items = await cursor.to_list(length=MAX_PORTFOLIO_LOTS)
+    buy_dates = pd.to_datetime([i["buy_date"] for i in items], errors="coerce")
+    if not items or buy_dates.isna().all():
+        return {"equity_curve": [], "summary": None, "missing_symbols": []}
+
+    period = history_period_for(buy_dates.min().tz_localize(None))
+    symbols = sorted({i["symbol"] for i in items}) + [benchmark]
+    frames = await asyncio.gather(*[to_thread(get_stock_data, s, period) for s in symbols])
+    frames = dict(zip(symbols, frames))
+    missing = [s for s in symbols[:-1] if frames[s].empty]
+    lots = [{k: i[k] for k in ("symbol", "quantity", "buy_price", "buy_date")} for i in items]
+    history = await to_thread(compute_portfolio_history, current_user["user_id"], lots, frames, benchmark)
+    if history is None:
+        return {"equity_curve": [], "summary": None, "missing_symbols": missing}
+    return {**history, "missing_symbols": missing}
+
+@api_router.get("/portfolio/correlation")
+async def get_portfolio_correlation(current_user: dict = Depends(get_current_user)):
+    cursor = db[PORTFOLIO_COL].find({"user_id": current_user["user_id"]})
+    items = await cursor.to_list(length=MAX_PORTFOLIO_LOTS)
+    symbols = sorted({i["symbol"].replace(".NS", "").replace(".BO", "") for i in items})
+    pending = []
+    try:
+        await asyncio.wait_for(track_correlation_symbols(symbols), FANOUT_DEADLINE)
+    except asyncio.TimeoutError:
+        # Histories keep loading into the caches; answer from what is indexed now
+        pending = [s for s in symbols if s not in CORRELATIONS]
+    tracked, matrix = CORRELATIONS.pairwise(symbols)
+    off_diagonal = matrix[~np.eye(len(tracked), dtype=bool)]
+    return {
+        "symbols": tracked,
+        "matrix": [[round(float(v), 4) for v in row] for row in matrix],
+        "average_correlation": round(float(off_diagonal.mean()), 4) if off_diagonal.size else None,
+        "as_of": CORRELATIONS.as_of.strftime("%Y-%m-%d") if CORRELATIONS.as_of is not None else None,
+        "window": len(CORRELATIONS.dates),
+        "missing_symbols": [s for s in symbols if s not in tracked and s not in pending],
+        "pending_symbols": pending
+    }
+
 @api_router.delete("/portfolio/{item_id}")
 async def remove_from_portfolio(item_id: str, current_user: dict = Depends(get_current_user)):
     result = await db[PORTFOLIO_COL].delete_one({"id": item_id, "user_id": current_user["user_id"]})
@@ -645,6 +1261,7 @@ async def remove_from_portfolio(item_id: str, current_user: dict = Depends(get_c
 
 @api_router.post("/alerts", response_model=AlertResponse)
 async def create_alert(alert: AlertCreate, current_user: dict = Depends(get_current_user)):
+    await ensure_capacity(ALERTS_COL, current_user["user_id"], 1, MAX_ALERTS, "alerts")
     alert_id = str(uuid.uuid4())
     created_at = datetime.now(timezone.utc).isoformat()
     new_alert = {
@@ -655,10 +1272,31 @@ async def create_alert(alert: AlertCreate, current_user: dict = Depends(get_curr
     await db[ALERTS_COL].insert_one(new_alert)
     return new_alert
 
+@api_router.post("/alerts/bulk")
+async def bulk_create_alerts(request: Request, background_tasks: BackgroundTasks, ordered: bool = True,
+                             current_user: dict = Depends(get_current_user)):
+    rows = await read_bulk_rows(request)
+    def check(alert):
+        if alert.alert_type not in ALERT_TYPES:
+            return f"alert_type must be one of {', '.join(ALERT_TYPES)}"
+    valid, results = validate_bulk_rows(rows, AlertCreate, check)
+    await ensure_capacity(ALERTS_COL, current_user["user_id"], len(valid), MAX_ALERTS, "alerts")
+    created_at = datetime.now(timezone.utc).isoformat()
+    docs = [(i, {
+        "id": str(uuid.uuid4()), "user_id": current_user["user_id"], "symbol": alert.symbol,
+        "alert_type": alert.alert_type, "threshold": alert.threshold,
+        "email_enabled": alert.email_enabled, "is_active": True, "created_at": created_at
+    }) for i, alert in valid]
+    response = await bulk_insert(ALERTS_COL, docs, results, ordered)
+    symbols = sorted({doc["symbol"] for i, doc in docs if results[i]["status"] == "created"})
+    if symbols:
+        background_tasks.add_task(prefetch_stock_data, symbols, ["5d"])
+    return response
+
 @api_router.get("/alerts")
 async def get_alerts(current_user: dict = Depends(get_current_user)):
     cursor = db[ALERTS_COL].find({"user_id": current_user["user_id"]})
-    return await cursor.to_list(length=100)
+    return await cursor.to_list(length=MAX_ALERTS)
 
 @api_router.delete("/alerts/{alert_id}")
 async def delete_alert(alert_id: str, current_user: dict = Depends(get_current_user)):
@@ -681,18 +1319,17 @@ async def toggle_alert(alert_id: str, current_user: dict = Depends(get_current_u
 @api_router.get("/dashboard/summary")
 async def get_dashboard_summary(current_user: dict = Depends(get_current_user)):
     cursor = db[PORTFOLIO_COL].find({"user_id": current_user["user_id"]})
-    portfolio = await cursor.to_list(length=200)
+    portfolio = await cursor.to_list(length=MAX_PORTFOLIO_LOTS)
     
-    async def fetch_item_value(item):
-        try:
-            df = await asyncio.to_thread(get_stock_data, item["symbol"], "5d")
-            current_price = df["Close"].iloc[-1] if not df.empty else item["buy_price"]
-        except Exception: current_price = item["buy_price"]
-        return item["quantity"] * item["buy_price"], item["quantity"] * current_price
-
-    results = await asyncio.gather(*[fetch_item_value(i) for i in portfolio])
-    total_invested = sum(r[0] for r in results)
-    total_current = sum(r[1] for r in results)
+    async def fetch_price(item):
+        df = await to_thread(get_stock_data, item["symbol"], "5d")
+        return float(df["Close"].iloc[-1]) if not df.empty else None
+
+    results = await fan_out(portfolio, fetch_price, FANOUT_DEADLINE, FANOUT_TASK_BUDGET,
+                            fallback=lambda i: get_cached_close(i["symbol"]),
+                            key=lambda i: f"price_{i['symbol']}")
+    total_invested = sum(r["item"]["quantity"] * r["item"]["buy_price"] for r in results)
+    total_current = sum(r["item"]["quantity"] * (r["value"] if r["value"] is not None else r["item"]["buy_price"]) for r in results)
     alerts_count = await db[ALERTS_COL].count_documents({"user_id": current_user["user_id"], "is_active": True})
     
     return {
@@ -700,11 +1337,145 @@ async def get_dashboard_summary(current_user: dict = Depends(get_current_user)):
             "total_invested": round(total_invested, 2), "total_current": round(total_current, 2),
             "total_pnl": round(total_current - total_invested, 2),
             "pnl_percent": round(((total_current - total_invested) / total_invested) * 100 if total_invested > 0 else 0, 2),
-            "holdings_count": len(portfolio)
+            "holdings_count": len(portfolio),
+            "complete": all(r["status"] == "fresh" for r in results)
         },
         "alerts_active": alerts_count
     }
 
+# ================= ADMIN ROUTES =================
+
+@api_router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return {"enabled": PROFILING_ENABLED, "sample_rate": PROFILE_SAMPLE_RATE, "profiles": PROFILE_BUFFER.list()}
+
+@api_router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, format: str = "pstats"):
+    record = PROFILE_BUFFER.get(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not record["stats"]:
+        raise HTTPException(status_code=404, detail="Profile recorded no calls")
+    if format == "text":
+        return PlainTextResponse(render_stats(record["stats"]))
+    return Response(
+        dump_stats(record["stats"]), media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+    )
+
+def key_mentions_symbol(key: str, base_symbol: str) -> bool:
+    # Keys embed the symbol as one "_"-separated part, with or without an exchange suffix
+    return any(part.upper().split(".")[0] == base_symbol for part in key.split("_"))
+
+async def invalidate_caches(namespace: Optional[str] = None, prefix: str = "", symbol: Optional[str] = None) -> Dict[str, int]:
+    names = [namespace] if namespace else list(CACHE_NAMESPACES)
+    base_symbol = symbol.upper().split(".")[0] if symbol else None
+    match = (lambda key: key_mentions_symbol(key, base_symbol)) if base_symbol else None
+    deleted = {}
+    for name in names:
+        if base_symbol and name == "portfolio_history":
+            # Curves are keyed by user and were built from the symbol's closes, so rebuild them all
+            deleted[name] = await to_thread(CACHE_NAMESPACES[name].invalidate, prefix)
+        else:
+            deleted[name] = await to_thread(CACHE_NAMESPACES[name].invalidate, prefix, match)
+    if "predictions" in names:
+        # The persisted store would otherwise serve the same predictions straight back
+        query = {"_id": {"$regex": f"^{re.escape(prefix)}"}} if prefix else {}
+        if base_symbol:
+            query["symbol"] = base_symbol
+        try:
+            deleted["prediction_store"] = (await db[PREDICTIONS_COL].delete_many(query)).deleted_count
+        except Exception as e:
+            logging.warning(f"Prediction store invalidation failed: {e!r}")
+    if "market_data" in names:
+        # The correlation index was built from these histories: drop the symbol (looked-up ones
+        # come back with fresh data on their next lookup) or rebuild, and refresh right away
+        if base_symbol:
+            deleted["correlations"] = int(await to_thread(CORRELATIONS.remove_symbol, base_symbol))
+        else:
+            CORRELATIONS.mark_stale()
+        CORRELATION_REFRESH_NOW.set()
+    return deleted
+
+async def run_cache_warmup(job: dict, request: CacheWarmupRequest, model: str):
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+    async def warm(symbol):
+        async with semaphore:
+            try:
+                if request.refresh:
+                    await invalidate_caches(symbol=symbol)
+                for period in request.periods:
+                    df = await to_thread(get_stock_data, symbol, period)
+                    if df.empty:
+                        raise ValueError(f"no {period} history")
+                if request.predictions and not await get_multi_timeframe_predictions(symbol, model):
+                    raise ValueError("insufficient data for predictions")
+            except Exception as e:
+                job["failed"][symbol] = str(e)
+            job["done"] += 1
+    try:
+        await asyncio.gather(*(warm(s) for s in job["symbols"]))
+        job["status"] = "completed"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        raise
+    finally:
+        job["finished_at"] = datetime.now(timezone.utc).isoformat()
+        job.pop("task", None)
+
+@api_router.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def list_cache_entries(namespace: Optional[str] = None, prefix: str = "", limit: int = 200):
+    if namespace and namespace not in CACHE_NAMESPACES:
+        raise HTTPException(status_code=404, detail=f"Unknown namespace, use one of {', '.join(CACHE_NAMESPACES)}")
+    names = [namespace] if namespace else list(CACHE_NAMESPACES)
+    result = {}
+    for name in names:
+        entries = await to_thread(CACHE_NAMESPACES[name].entries, prefix)
+        entries.sort(key=lambda e: e["hits"], reverse=True)
+        result[name] = {
+            "count": len(entries),
+            "size_bytes": sum(e["size_bytes"] for e in entries),
+            "hits": sum(e["hits"] for e in entries),
+            "entries": entries[:limit]
+        }
+    return {"backend": CACHE_BACKEND, "namespaces": result}
+
+@api_router.delete("/admin/cache", dependencies=[Depends(require_admin)])
+async def invalidate_cache_entries(namespace: Optional[str] = None, prefix: str = "", symbol: Optional[str] = None):
+    if namespace and namespace not in CACHE_NAMESPACES:
+        raise HTTPException(status_code=404, detail=f"Unknown namespace, use one of {', '.join(CACHE_NAMESPACES)}")
+    if not (namespace or prefix or symbol):
+        raise HTTPException(status_code=400, detail="Give a namespace, prefix or symbol to invalidate")
+    deleted = await invalidate_caches(namespace, prefix, symbol)
+    return {"deleted": deleted, "total": sum(deleted.values())}
+
+@api_router.post("/admin/cache/warmup", dependencies=[Depends(require_admin)], status_code=202)
+async def start_cache_warmup(request: CacheWarmupRequest):
+    model = request.model or MODEL_BACKEND
+    if model not in MODEL_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown model, use one of {', '.join(MODEL_BACKENDS)}")
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols to warm up")
+    job = {
+        "id": uuid.uuid4().hex[:12], "status": "running", "symbols": symbols, "periods": request.periods,
+        "predictions": request.predictions, "model": model, "total": len(symbols), "done": 0, "failed": {},
+        "started_at": datetime.now(timezone.utc).isoformat(), "finished_at": None
+    }
+    job["task"] = asyncio.create_task(run_cache_warmup(job, request, model))
+    WARMUP_JOBS[job["id"]] = job
+    for old_id in list(WARMUP_JOBS)[:-WARMUP_JOBS_KEPT]:
+        if WARMUP_JOBS[old_id]["status"] != "running":
+            WARMUP_JOBS.pop(old_id)
+    return {k: v for k, v in job.items() if k != "task"}
+
+@api_router.get("/admin/cache/warmup/{job_id}", dependencies=[Depends(require_admin)])
+async def get_cache_warmup(job_id: str):
+    job = WARMUP_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Warm-up job not found")
+    return {**{k: v for k, v in job.items() if k != "task"}, "progress": round(job["done"] / job["total"] * 100, 1)}
+
 app.include_router(api_router)
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Local load generator for the backend.
+
+By default the app is started in-process (httpx ASGI transport) with the replay
+market data provider and an in-memory Mongo stand-in, so nothing leaves the
+machine. Pass --base-url to drive an already running server instead, e.g. one
+started with MARKET_DATA_PROVIDER=replay and several uvicorn workers.
+
+    python backend_load_test.py --stages 1,5,10,25 --stage-seconds 20 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+DASHBOARD_SYMBOLS = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "SBIN", "AXISBANK", "LT", "ITC", "BHARTIARTL"]
+ANALYSIS_SYMBOLS = DASHBOARD_SYMBOLS + ["WIPRO", "MARUTI", "TITAN", "ASIANPAINT", "KOTAKBANK", "BAJFINANCE"]
+SEARCH_TERMS = ["reliance", "tata", "infosys", "hdfc", "bank", "pharma"]
+
+
+# ================= IN-MEMORY MONGO =================
+
+def _compare(value, op, expected):
+    if op == "$eq":
+        return value == expected
+    if op == "$ne":
+        return value != expected
+    if op == "$in":
+        return value in expected
+    if op == "$nin":
+        return value not in expected
+    if op == "$exists":
+        return (value is not None) == expected
+    if op == "$regex":
+        return isinstance(value, str) and re.search(expected, value) is not None
+    if value is None:
+        return False
+    return {"$lt": value < expected, "$lte": value <= expected,
+            "$gt": value > expected, "$gte": value >= expected}[op]
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not all(_compare(doc.get(key), op, v) for op, v in cond.items()):
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Result:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class InMemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length] if length else self.docs
+
+
+class InMemoryCollection:
+    """The subset of motor's AsyncIOMotorCollection the backend uses."""
+
+    def __init__(self):
+        self.docs = []
+
+    async def create_index(self, *args, **kwargs):
+        return "index"
+
+    async def find_one(self, query=None):
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return copy.deepcopy(doc)
+        return None
+
+    def find(self, query=None):
+        return InMemoryCursor([copy.deepcopy(d) for d in self.docs if _matches(d, query or {})])
+
+    async def insert_one(self, doc):
+        from bson import ObjectId
+        from pymongo.errors import DuplicateKeyError
+        doc.setdefault("_id", ObjectId())
+        if any(d["_id"] == doc["_id"] for d in self.docs):
+            raise DuplicateKeyError(f"duplicate key: {doc['_id']!r}")
+        self.docs.append(copy.deepcopy(doc))
+        return _Result(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        from pymongo.errors import BulkWriteError, DuplicateKeyError
+        ids, errors = [], []
+        for i, doc in enumerate(docs):
+            try:
+                ids.append((await self.insert_one(doc)).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ids)})
+        return _Result(inserted_ids=ids)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return _Result(matched_count=1, modified_count=1)
+        return _Result(matched_count=0, modified_count=0)
+
+    async def find_one_and_update(self, query, update, upsert=False):
+        for doc in self.docs:
+            if _matches(doc, query):
+                before = copy.deepcopy(doc)
+                doc.update(update.get("$set", {}))
+                return before
+        if upsert:
+            # Like Mongo, the new document takes the query's equality fields
+            new = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            await self.insert_one({**new, **update.get("$set", {})})
+        return None
+
+    async def replace_one(self, query, replacement, upsert=False):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                self.docs[i] = {"_id": doc["_id"], **copy.deepcopy(replacement)}
+                return _Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            new = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            inserted = await self.insert_one({**new, **replacement})
+            return _Result(matched_count=0, modified_count=0, upserted_id=inserted.inserted_id)
+        return _Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def delete_one(self, query):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                del self.docs[i]
+                return _Result(deleted_count=1)
+        return _Result(deleted_count=0)
+
+    async def delete_many(self, query):
+        kept = [d for d in self.docs if not _matches(d, query)]
+        removed = len(self.docs) - len(kept)
+        self.docs = kept
+        return _Result(deleted_count=removed)
+
+    async def count_documents(self, query):
+        return sum(1 for d in self.docs if _matches(d, query))
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.collections = defaultdict(InMemoryCollection)
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+# ================= METRICS =================
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # (stage, route) -> [(latency, ok)]
+        self.stage = None
+
+    def add(self, route, latency, ok):
+        self.samples[(self.stage, route)].append((latency, ok))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+async def call(client, recorder, method, route, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 500
+    except Exception:
+        response, ok = None, False
+    recorder.add(route, time.perf_counter() - start, ok)
+    return response
+
+
+async def monitor_loop_lag(lags, interval=0.05):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+# ================= USER SESSIONS =================
+
+async def user_session(client, recorder, stop_at, rng):
+    email = f"load_{uuid.uuid4().hex[:10]}@example.com"
+    password = "LoadTest123!"
+    await call(client, recorder, "POST", "POST /api/auth/register", "/api/auth/register",
+               json={"email": email, "password": password, "name": "Load Tester"})
+    response = await call(client, recorder, "POST", "POST /api/auth/login", "/api/auth/login",
+                          json={"email": email, "password": password})
+    if response is None or response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    for symbol in rng.sample(DASHBOARD_SYMBOLS, 3):
+        await call(client, recorder, "POST", "POST /api/portfolio/add", "/api/portfolio/add", headers=headers,
+                   json={"symbol": symbol, "quantity": rng.randint(1, 50),
+                         "buy_price": rng.uniform(100, 3000), "buy_date": "2025-06-02"})
+
+    while time.perf_counter() < stop_at:
+        action = rng.choices(["dashboard", "search", "analysis"], weights=[4, 3, 3])[0]
+        if action == "dashboard":
+            await asyncio.gather(
+                call(client, recorder, "GET", "GET /api/dashboard/summary", "/api/dashboard/summary", headers=headers),
+                call(client, recorder, "GET", "GET /api/market/movers", "/api/market/movers"),
+                call(client, recorder, "GET", "GET /api/market/news", "/api/market/news"),
+                call(client, recorder, "GET", "GET /api/portfolio", "/api/portfolio", headers=headers),
+                call(client, recorder, "GET", "GET /api/dashboard/predictions", "/api/dashboard/predictions", headers=headers),
+            )
+        elif action == "search":
+            term = rng.choice(SEARCH_TERMS)
+            for i in range(1, len(term) + 1):
+                await call(client, recorder, "GET", "GET /api/stocks/search", "/api/stocks/search", params={"q": term[:i]})
+                await asyncio.sleep(rng.uniform(0.05, 0.15))
+        else:
+            symbol = rng.choice(ANALYSIS_SYMBOLS)
+            await asyncio.gather(
+                call(client, recorder, "GET", "GET /api/stocks/{symbol}", f"/api/stocks/{symbol}", params={"period": "1y"}),
+                call(client, recorder, "GET", "GET /api/stocks/{symbol}/predictions", f"/api/stocks/{symbol}/predictions"),
+                call(client, recorder, "GET", "GET /api/stocks/{symbol}/news", f"/api/stocks/{symbol}/news"),
+            )
+        await asyncio.sleep(rng.uniform(0.5, 2.0))
+
+
+async def run_stage(client, recorder, users, seconds, seed):
+    recorder.stage = users
+    stop_at = time.perf_counter() + seconds
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(users):
+        sessions.append(asyncio.create_task(user_session(client, recorder, stop_at, random.Random(rng.random()))))
+        await asyncio.sleep(min(1.0, seconds / 10) / max(users, 1))
+    await asyncio.gather(*sessions)
+
+
+# ================= REPORT =================
+
+def build_report(recorder, durations, lags):
+    report = []
+    for users, duration in durations.items():
+        routes = {route: s for (stage, route), s in recorder.samples.items() if stage == users}
+        total = sum(len(s) for s in routes.values())
+        errors = sum(1 for s in routes.values() for _, ok in s if not ok)
+        report.append({
+            "users": users,
+            "requests": total,
+            "throughput_rps": round(total / duration, 2) if duration else 0,
+            "error_rate": round(errors / total, 4) if total else 0,
+            "max_loop_lag_ms": round(max(lags.get(users, [0]), default=0) * 1000, 1),
+            "routes": {
+                route: {
+                    "count": len(s),
+                    "p50_ms": round(percentile([l for l, _ in s], 50) * 1000, 1),
+                    "p95_ms": round(percentile([l for l, _ in s], 95) * 1000, 1),
+                    "p99_ms": round(percentile([l for l, _ in s], 99) * 1000, 1),
+                    "error_rate": round(sum(1 for _, ok in s if not ok) / len(s), 4)
+                } for route, s in sorted(routes.items())
+            }
+        })
+    return report
+
+
+def print_report(report):
+    for stage in report:
+        print(f"\n=== {stage['users']} concurrent users: {stage['requests']} requests, "
+              f"{stage['throughput_rps']} req/s, errors {stage['error_rate'] * 100:.2f}%, "
+              f"max event-loop lag {stage['max_loop_lag_ms']} ms ===")
+        print(f"{'route':<42}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}")
+        for route, r in stage["routes"].items():
+            print(f"{route:<42}{r['count']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['error_rate'] * 100:>8.2f}")
+
+
+# ================= ENTRY POINT =================
+
+def load_in_process_app(args):
+    replay_dir = args.replay_dir or tempfile.mkdtemp(prefix="stocksense_replay_")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ["MARKET_DATA_PROVIDER"] = "replay"
+    os.environ["REPLAY_DATA_DIR"] = replay_dir
+    os.environ["PROVIDER_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["PROVIDER_LATENCY_JITTER_MS"] = str(args.latency_jitter_ms)
+    sys.path.insert(0, str(BACKEND_DIR))
+    from market_data import generate_replay_data
+    generate_replay_data(replay_dir, [f"{s}.NS" for s in ANALYSIS_SYMBOLS] + ["^NSEI", "^BSESN"])
+    import server
+    server.db = InMemoryDatabase()
+    return server.app
+
+
+async def main(args):
+    stages = [int(s) for s in args.stages.split(",")]
+    recorder = Recorder()
+    durations, lags = {}, defaultdict(list)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        lifespan = None
+    else:
+        app = load_in_process_app(args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    try:
+        for i, users in enumerate(stages):
+            stage_lags = []
+            monitor = asyncio.create_task(monitor_loop_lag(stage_lags))
+            start = time.perf_counter()
+            await run_stage(client, recorder, users, args.stage_seconds, args.seed + i)
+            durations[users] = time.perf_counter() - start
+            monitor.cancel()
+            lags[users] = stage_lags
+    finally:
+        await client.aclose()
+        if lifespan:
+            await lifespan.__aexit__(None, None, None)
+
+    report = build_report(recorder, durations, lags)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp simulated user sessions against the backend")
+    parser.add_argument("--base-url", help="Drive a running server (e.g. http://localhost:8000) instead of in-process")
+    parser.add_argument("--stages", default="1,5,10,25", help="Comma-separated concurrent user counts to ramp through")
+    parser.add_argument("--stage-seconds", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated upstream latency (in-process only)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=50)
+    parser.add_argument("--replay-dir", help="Replay data directory (generated into a temp dir by default)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+import cache_backends
+from cache_backends import KeyValueCache, LocalKVClient, MemoryCache, SQLiteCache
+
+
+@pytest.fixture(params=["memory", "sqlite", "local_kv"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache()
+    if request.param == "sqlite":
+        return SQLiteCache(str(tmp_path / "cache.sqlite3"), "test")
+    return KeyValueCache(LocalKVClient(), "test", ttl=60)
+
+
+def entry(data, age=0.0):
+    return {"timestamp": time.time() - age, "data": data}
+
+
+def test_roundtrip_and_invalidate(cache):
+    cache.set("hist_TCS_5d", entry([1, 2]))
+    cache.set("hist_INFY_5d", entry([3]))
+    cache.set("candles_TCS_1wk", entry([4]))
+    assert cache.get("hist_TCS_5d")["data"] == [1, 2]
+    assert cache.get("missing") is None
+    assert sorted(cache.keys("hist_")) == ["hist_INFY_5d", "hist_TCS_5d"]
+    assert cache.invalidate("", lambda k: "TCS" in k) == 2
+    assert cache.keys() == ["hist_INFY_5d"]
+
+
+def test_hits_are_counted_and_survive_refresh(cache):
+    cache.set("a", entry("x"))
+    for _ in range(3):
+        cache.get("a")
+    cache.get("missing")
+    cache.set("a", entry("y"))
+    cache.get("a")
+    (listed,) = cache.entries()
+    assert listed["key"] == "a" and listed["hits"] == 4 and listed["size_bytes"] > 0
+
+
+def test_reads_do_not_write_until_flush(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "test")
+    cache.set("a", entry("x"))
+    writes = []
+    monkeypatch.setattr(cache, "_write_hits", writes.append)
+    for _ in range(5):
+        cache.get("a")
+    assert writes == []
+    monkeypatch.setattr(cache, "hits_flushed_at", time.monotonic() - cache_backends.HITS_FLUSH_INTERVAL)
+    cache.get("a")
+    assert writes == [{"a": 6}]
+
+
+def test_failed_flush_does_not_fail_reads(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "test")
+    cache.set("a", entry("x"))
+
+    def broken(pending):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(cache, "_write_hits", broken)
+    monkeypatch.setattr(cache, "hits_flushed_at", 0.0)
+    assert cache.get("a")["data"] == "x"
+
+
+def test_kv_hit_counters_expire_with_entry():
+    client = LocalKVClient()
+    cache = KeyValueCache(client, "test", ttl=60)
+    cache.set("a", entry("x"))
+    cache.get("a")
+    cache.flush_hits()
+    counter = cache.hits_prefix + "a"
+    assert int(client.get(counter)) == 1
+    assert client.expires[counter] == pytest.approx(client.expires[cache.prefix + "a"], abs=1)
+    # A counter flushed after its entry was deleted is recreated with an expiry too
+    cache.get("a")
+    cache.delete("a")
+    cache.flush_hits()
+    assert counter in client.expires
+
+
+def test_sqlite_prunes_entries_past_retention(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "test", ttl=3600)
+    other = SQLiteCache(str(tmp_path / "cache.sqlite3"), "other", ttl=3600)
+    other.set("old", entry("x", age=7200))
+    cache.set("old", entry("x", age=7200))
+    assert cache.keys() == [] and other.keys() == []
+    other.set("old", entry("x", age=7200))
+    cache.set("fresh", entry("y"))
+    # Later writes within PRUNE_INTERVAL do not prune again
+    cache.set("old", entry("x", age=7200))
+    assert sorted(cache.keys()) == ["fresh", "old"]
+    monkeypatch.setattr(cache, "pruned_at", float("-inf"))
+    cache.set("fresh", entry("z"))
+    assert cache.keys() == ["fresh"]
+    assert other.keys() == ["old"]
+
+
+def test_memory_cache_expires_and_bounds_entries(monkeypatch):
+    cache = MemoryCache(ttl=3600, max_entries=3)
+    cache.set("old", entry("x", age=7200))
+    assert cache.keys() == []
+    for key in ("a", "b", "c"):
+        cache.set(key, entry(key))
+    cache.get("a")
+    cache.set("d", entry("d"))
+    # The least recently used entry goes first
+    assert cache.keys() == ["c", "a", "d"]
+    cache.set("c", entry("c", age=7200))
+    monkeypatch.setattr(cache, "pruned_at", float("-inf"))
+    cache.set("a", entry("a"))
+    assert cache.keys() == ["d", "a"]
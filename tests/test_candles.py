@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from candles import AUTO_INTERVALS, choose_interval, interval_available, resample_ohlcv, update_candles
+
+MAX_CHART_POINTS = 250  # server.MAX_CHART_POINTS
+SESSIONS_PER_PERIOD = {"2y": 504, "5y": 1260, "10y": 2520}
+
+
+def daily_bars(periods, start="2024-01-01"):
+    index = pd.bdate_range(start, periods=periods, tz="Asia/Kolkata")
+    close = 100 + np.arange(periods, dtype="float64")
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.full(periods, 10)}, index=index)
+
+
+def test_intraday_intervals_only_cover_recent_periods():
+    assert interval_available("1m", "5d") and not interval_available("1m", "1mo")
+    assert interval_available("5m", "1mo") and not interval_available("5m", "1y")
+    assert interval_available("60m", "1y") and not interval_available("60m", "5y")
+    assert interval_available("1wk", "max") and interval_available("1d", "10y")
+    assert all(interval_available(choose_interval(p), p) for p in AUTO_INTERVALS)
+
+
+def test_automatic_interval_fits_the_chart():
+    for period, sessions in SESSIONS_PER_PERIOD.items():
+        candles = resample_ohlcv(daily_bars(sessions), choose_interval(period))
+        assert len(candles) <= MAX_CHART_POINTS
+
+
+def test_update_matches_full_resample():
+    daily = daily_bars(60)
+    cached = resample_ohlcv(daily.iloc[:40], "1wk")
+    pd.testing.assert_frame_equal(update_candles(cached, daily, "1wk"), resample_ohlcv(daily, "1wk"))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationEngine
+
+
+def returns_frame(symbols, sessions=40, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(0, 0.02, (sessions, len(symbols))), columns=symbols,
+                        index=pd.bdate_range("2024-01-01", periods=sessions))
+
+
+def test_incremental_update_matches_rebuild():
+    returns = returns_frame(["A", "B", "C", "D"], sessions=50)
+    engine = CorrelationEngine(window=30, k=2)
+    engine.update(returns.iloc[:45])
+    assert engine.update(returns) == "updated"
+    expected = returns.iloc[-30:].corr().to_numpy()
+    np.testing.assert_allclose(engine.corr, expected, atol=1e-9)
+    assert engine.update(returns) == "unchanged"
+
+
+def test_added_symbols_are_evicted_least_recently_used_first():
+    returns = returns_frame(["A", "B", "X", "Y", "Z"])
+    engine = CorrelationEngine(window=30, k=2, max_symbols=4)
+    engine.update(returns[["A", "B"]])
+    assert engine.add_symbol("X", returns["X"]) and engine.add_symbol("Y", returns["Y"])
+    engine.similar("X")
+    assert engine.add_symbol("Z", returns["Z"])
+    assert engine.symbols == ["A", "B", "X", "Z"]
+    np.testing.assert_allclose(engine.corr, returns[["A", "B", "X", "Z"]].iloc[-30:].corr().to_numpy(), atol=1e-9)
+    # Pinned symbols are never evicted, so a full index of them rejects new symbols
+    pinned = CorrelationEngine(window=30, k=2, max_symbols=3)
+    pinned.update(returns[["A", "B"]])
+    assert pinned.add_symbol("X", returns["X"], pinned=True)
+    assert not pinned.add_symbol("Y", returns["Y"])
+
+
+def test_added_symbols_survive_refresh_and_can_be_removed():
+    returns = returns_frame(["A", "B", "C", "X"])
+    engine = CorrelationEngine(window=30, k=2, max_symbols=10)
+    engine.update(returns[["A", "B", "C"]])
+    engine.add_symbol("X", returns["X"])
+    engine.mark_stale()
+    assert engine.update(returns) == "rebuilt"
+    assert list(engine.on_demand) == ["X"]
+    assert engine.remove_symbol("B") and not engine.remove_symbol("B")
+    assert "B" not in engine and engine.pairwise(["A", "B", "X"])[0] == ["A", "X"]
+    np.testing.assert_allclose(engine.corr, returns[["A", "C", "X"]].iloc[-30:].corr().to_numpy(), atol=1e-9)
+    assert engine.similar("B") is None
+    assert engine.similar("A", k=1)[0][1] == pytest.approx(engine.corr[0, 1:].max())
+
+
+def test_batch_add_never_evicts_its_own_symbols():
+    returns = returns_frame(["A", "B", "X", "Y", "P", "Q", "R"])
+    engine = CorrelationEngine(window=30, k=2, max_symbols=5)
+    engine.update(returns[["A", "B"]])
+    engine.add_symbols(returns[["X", "Y"]])
+    added = engine.add_symbols(returns[["Y", "P", "Q", "R"]], pinned=["R"])
+    # X is evicted to make room; the batch is cut to what fits rather than evicting itself
+    assert added == ["Y", "P", "Q"]
+    assert engine.symbols == ["A", "B", "Y", "P", "Q"] and list(engine.on_demand) == ["Y", "P", "Q"]
+    np.testing.assert_allclose(engine.corr, returns[engine.symbols].iloc[-30:].corr().to_numpy(), atol=1e-9)
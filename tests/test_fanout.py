@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import fanout
+from fanout import fan_out
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_results_keep_input_order_and_status():
+    async def worker(item):
+        if item == "bad":
+            raise RuntimeError("upstream failed")
+        await asyncio.sleep(0.01 if item == "a" else 0)
+        return item.upper()
+
+    results = run(fan_out(["a", "bad", "b"], worker, deadline=1, task_budget=1))
+    assert [(r["item"], r["status"], r["value"]) for r in results] == [
+        ("a", "fresh", "A"), ("bad", "error", None), ("b", "fresh", "B")
+    ]
+
+
+def test_late_worker_is_pending_and_finishes_in_background():
+    done = []
+
+    async def worker(item):
+        await asyncio.sleep(0.1)
+        done.append(item)
+        return item
+
+    async def main():
+        results = await fan_out(["slow"], worker, deadline=0.01, task_budget=1)
+        assert done == [] and fanout._BACKGROUND_TASKS
+        await asyncio.sleep(0.2)
+        return results
+
+    assert run(main())[0]["status"] == "pending"
+    assert done == ["slow"] and not fanout._BACKGROUND_TASKS and not fanout._IN_FLIGHT
+
+
+def test_background_work_stops_at_task_budget():
+    done = []
+
+    async def worker(item):
+        await asyncio.sleep(0.2)
+        done.append(item)
+
+    async def main():
+        await fan_out(["slow"], worker, deadline=0.01, task_budget=0.05)
+        await asyncio.sleep(0.3)
+
+    run(main())
+    assert done == [] and not fanout._BACKGROUND_TASKS
+
+
+def test_fallback_runs_off_the_loop_for_missed_items_only():
+    loop_thread = threading.get_ident()
+    fallback_calls = []
+
+    async def worker(item):
+        if item == "late":
+            await asyncio.sleep(0.1)
+        if item == "bad":
+            raise RuntimeError("upstream failed")
+        return "fresh"
+
+    def fallback(item):
+        fallback_calls.append((item, threading.get_ident() != loop_thread))
+        return "cached" if item == "bad" else None
+
+    results = run(fan_out(["ok", "late", "bad"], worker, deadline=0.02, task_budget=1, fallback=fallback))
+    assert [(r["status"], r["value"]) for r in results] == [("fresh", "fresh"), ("pending", None), ("stale", "cached")]
+    assert fallback_calls == [("late", True), ("bad", True)]
+
+
+def test_same_key_shares_one_task():
+    calls = []
+
+    async def worker(item):
+        calls.append(item)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(
+            fan_out(["TCS"], worker, deadline=1, task_budget=1, key=lambda s: f"price_{s}"),
+            fan_out(["TCS", "TCS"], worker, deadline=1, task_budget=1, key=lambda s: f"price_{s}"),
+        )
+
+    first, second = run(main())
+    assert calls == ["TCS"]
+    assert [r["value"] for r in first + second] == [1, 1, 1]
+    assert not fanout._IN_FLIGHT
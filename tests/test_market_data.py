@@ -0,0 +1,30 @@
+import pytest
+import yfinance
+
+from market_data import YFinanceProvider
+
+
+class FailingTicker:
+    def __init__(self, message):
+        self.message = message
+
+    def history(self, **kwargs):
+        raise Exception(self.message)
+
+
+@pytest.mark.parametrize("message", [
+    "TCS.NS: No timezone found, symbol may be delisted",
+    "TCS.NS: Period 'bogus' is invalid, must be one of ['1d', '5d']",
+    "TCS.NS: 5m data not available for startTime=1 and endTime=2. The requested range must be within the last 60 days.",
+    "NOPE.NS: No price data found, symbol may be delisted (period=1y)",
+])
+def test_request_errors_are_an_empty_history(monkeypatch, message):
+    monkeypatch.setattr(yfinance, "Ticker", lambda symbol: FailingTicker(message))
+    assert YFinanceProvider().history("TCS.NS", "1y").empty
+
+
+def test_upstream_errors_are_raised(monkeypatch):
+    message = "TCS.NS: No price data found, symbol may be delisted (period=1y)(Yahoo status_code = 429)"
+    monkeypatch.setattr(yfinance, "Ticker", lambda symbol: FailingTicker(message))
+    with pytest.raises(Exception, match="status_code"):
+        YFinanceProvider().history("TCS.NS", "1y")
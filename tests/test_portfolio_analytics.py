@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_analytics import (
+    build_equity_curve, close_matrix, daily_returns, extend_equity_curve,
+    money_weighted_return, time_weighted_return
+)
+
+
+def closes_frame(prices: dict, start: str = "2024-01-01") -> pd.DataFrame:
+    n = len(next(iter(prices.values())))
+    return pd.DataFrame(prices, index=pd.bdate_range(start, periods=n), dtype="float64")
+
+
+def lot(symbol, quantity, buy_price, buy_date):
+    return {"symbol": symbol, "quantity": quantity, "buy_price": buy_price, "buy_date": buy_date}
+
+
+def test_buy_day_loss_counts_towards_twr():
+    closes = closes_frame({"A": [500.0] * 5})
+    state = build_equity_curve([lot("A", 1, 1000, "2024-01-01")], closes)
+    returns = state["curve"]["daily_return"].to_numpy()
+    assert returns[0] == pytest.approx(-0.5)
+    assert time_weighted_return(returns) == pytest.approx(-0.5)
+
+
+def test_later_lot_below_close_is_not_credited_to_existing_capital():
+    closes = closes_frame({"A": [100.0] * 5})
+    lots = [lot("A", 1, 100, "2024-01-01"), lot("A", 1, 50, "2024-01-03")]
+    curve = build_equity_curve(lots, closes)["curve"]
+    assert curve["cash_flow"].tolist() == [100.0, 0.0, 50.0, 0.0, 0.0]
+    assert curve["value"].tolist() == [100.0, 100.0, 200.0, 200.0, 200.0]
+    # 200 / (100 + 50) - 1 on the second buy day, flat otherwise
+    assert time_weighted_return(curve["daily_return"].to_numpy()) == pytest.approx(1 / 3)
+
+
+def test_twr_ignores_deposit_timing():
+    closes = closes_frame({"A": [100.0, 110.0, 110.0, 121.0]})
+    single = build_equity_curve([lot("A", 1, 100, "2024-01-01")], closes)["curve"]
+    topped_up = build_equity_curve([lot("A", 1, 100, "2024-01-01"), lot("A", 5, 110, "2024-01-03")], closes)["curve"]
+    assert time_weighted_return(single["daily_return"].to_numpy()) == pytest.approx(0.21)
+    assert time_weighted_return(topped_up["daily_return"].to_numpy()) == pytest.approx(0.21)
+
+
+def test_lot_before_listing_and_multiple_symbols():
+    closes = close_matrix({
+        "A": pd.DataFrame({"Close": [10.0, 11.0, 12.0]}, index=pd.bdate_range("2024-01-01", periods=3)),
+        "B": pd.DataFrame({"Close": [20.0, 22.0]}, index=pd.bdate_range("2024-01-02", periods=2)),
+    })
+    state = build_equity_curve([lot("A", 2, 10, "2024-01-01"), lot("B", 1, 20, "2024-01-02")], closes)
+    assert state["curve"]["value"].tolist() == [20.0, 42.0, 46.0]
+    assert state["holdings"].tolist() == [2.0, 1.0]
+
+
+def test_extend_matches_full_rebuild():
+    rng = np.random.default_rng(3)
+    prices = {s: 100 * np.cumprod(1 + rng.normal(0, 0.02, 60)) for s in ("A", "B")}
+    closes = closes_frame(prices)
+    lots = [lot("A", 3, 90, "2024-01-02"), lot("B", 2, 120, "2024-01-15"), lot("A", 1, 100, "2024-02-01")]
+    full = build_equity_curve(lots, closes)
+    partial = build_equity_curve(lots, closes.iloc[:-10])
+    # The last cached close was intraday and has moved since
+    revised = closes.copy()
+    revised.iloc[-11] *= 1.01
+    extended = extend_equity_curve(partial, revised)
+    expected = build_equity_curve(lots, revised)["curve"]
+    pd.testing.assert_frame_equal(extended["curve"], expected)
+    assert len(extended["curve"]) == len(full["curve"])
+
+
+def test_daily_returns_empty():
+    assert daily_returns(np.array([]), np.array([])).tolist() == []
+
+
+def test_mwr_single_deposit():
+    dates = pd.DatetimeIndex(["2023-01-01", "2024-01-01"])
+    assert money_weighted_return(dates, np.array([1000.0, 0.0]), 1100.0) == pytest.approx(0.1, abs=1e-6)
+
+
+def test_mwr_two_deposits_solves_npv():
+    dates = pd.DatetimeIndex(["2022-01-01", "2023-01-01", "2024-01-01"])
+    flows = np.array([1000.0, 1000.0, 0.0])
+    final = 1000 * 1.05 ** 2 + 1000 * 1.05
+    assert money_weighted_return(dates, flows, final) == pytest.approx(0.05, abs=1e-4)
+
+
+def test_mwr_loss_and_degenerate_cases():
+    dates = pd.DatetimeIndex(["2023-01-01", "2024-01-01"])
+    assert money_weighted_return(dates, np.array([1000.0, 0.0]), 500.0) == pytest.approx(-0.5, abs=1e-3)
+    assert money_weighted_return(dates, np.array([0.0, 0.0]), 100.0) is None
+    assert money_weighted_return(dates, np.array([1000.0, 0.0]), 0.0) is None
+    same_day = pd.DatetimeIndex(["2024-01-01", "2024-01-01"])
+    assert money_weighted_return(same_day, np.array([1000.0, 0.0]), 1100.0) is None
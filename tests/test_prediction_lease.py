@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MARKET_DATA_PROVIDER", "replay")
+
+import server
+from backend_load_test import InMemoryCollection, InMemoryDatabase
+from cache_backends import MemoryCache
+
+
+class SlowCollection(InMemoryCollection):
+    """Yields to the event loop on every call, like a real Mongo round trip."""
+
+    def __getattribute__(self, name):
+        attr = super().__getattribute__(name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def delayed(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return await attr(*args, **kwargs)
+        return delayed
+
+
+@pytest.fixture
+def predictions(monkeypatch):
+    db = InMemoryDatabase()
+    db.collections.default_factory = SlowCollection
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "PREDICTION_CACHE", MemoryCache())
+    monkeypatch.setattr(server, "PREDICTION_LEASE_POLL", 0.005)
+    calls = []
+
+    async def compute(symbol, model):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return {"7d": {"predicted_price": 100.0}}
+
+    monkeypatch.setattr(server, "compute_predictions", compute)
+    return db, calls
+
+
+def test_concurrent_callers_train_once(predictions):
+    db, calls = predictions
+
+    async def main():
+        return await asyncio.gather(*[server.get_multi_timeframe_predictions("TCS", "rf") for _ in range(3)])
+
+    results = asyncio.run(main())
+    assert calls == ["TCS"]
+    assert all(r == {"7d": {"predicted_price": 100.0}} for r in results)
+    assert db[server.PREDICTION_LEASES_COL].docs == []
+    assert [d["_id"] for d in db[server.PREDICTIONS_COL].docs] == ["TCS_rf"]
+
+
+def test_caller_after_release_reads_store(predictions):
+    db, calls = predictions
+
+    async def main():
+        await server.get_multi_timeframe_predictions("INFY", "rf")
+        server.PREDICTION_CACHE.clear()
+        return await server.get_multi_timeframe_predictions("INFY", "rf")
+
+    assert asyncio.run(main()) == {"7d": {"predicted_price": 100.0}}
+    assert calls == ["INFY"]
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from price_series import PriceSeries
+
+
+def test_roundtrip_with_missing_volume():
+    index = pd.DatetimeIndex(["2024-01-01", "2024-01-02", "2024-01-03"], tz="Asia/Kolkata")
+    df = pd.DataFrame({
+        "Open": [10.0, 11.0, 12.0], "High": [11.0, 12.0, 13.0], "Low": [9.0, 10.0, 11.0],
+        "Close": [10.5, 11.5, 12.5], "Volume": [1000.0, np.nan, 3000.0], "Dividends": 0.0,
+    }, index=index)
+    series = PriceSeries.from_frame(df)
+    assert series.unit == "D"
+    assert series.volume.tolist() == [1000, 0, 3000]
+    frame = series.to_frame()
+    assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert frame["Close"].tolist() == [10.5, 11.5, 12.5] and series.last_close() == 12.5
+    assert frame.index.strftime("%Y-%m-%d").tolist() == ["2024-01-01", "2024-01-02", "2024-01-03"]
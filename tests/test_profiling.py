@@ -0,0 +1,56 @@
+import asyncio
+import cProfile
+
+import profiling
+from profiling import ProfileBuffer, ProfilingMiddleware, to_thread
+
+
+def work(n):
+    return sum(i * i for i in range(n))
+
+
+async def app(scope, receive, send):
+    await to_thread(work, 50000)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def run_requests(middleware, count):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def main():
+        scope = {"type": "http", "method": "GET", "path": "/api/x", "headers": []}
+        await asyncio.gather(*[middleware(scope, receive, send) for _ in range(count)])
+
+    asyncio.run(main())
+    return [m["status"] for m in sent if m["type"] == "http.response.start"]
+
+
+def test_concurrent_profiled_requests_succeed_and_capture_thread_work():
+    buffer = ProfileBuffer()
+    assert run_requests(ProfilingMiddleware(app, buffer, sample_rate=1.0), 3) == [200, 200, 200]
+    records = buffer.list()
+    assert len(records) == 3 and all(r["thread_cpu_ms"] > 0 for r in records)
+    profiled = [buffer.get(r["id"]) for r in records if r["event_loop_profiled"]]
+    assert len(profiled) == 1
+    assert any(func[2] == "work" for func in profiled[0]["stats"].stats)
+
+
+def test_profiler_conflict_records_timing_only(monkeypatch):
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+    buffer = ProfileBuffer()
+    assert run_requests(ProfilingMiddleware(app, buffer, sample_rate=1.0), 2) == [200, 200]
+    records = [buffer.get(r["id"]) for r in buffer.list()]
+    assert all(r["stats"] is None and not r["event_loop_profiled"] and r["wall_ms"] > 0 for r in records)
+    assert profiling._LOOP_PROFILER_LOCK.acquire(blocking=False)
+    profiling._LOOP_PROFILER_LOCK.release()